@@ -0,0 +1,9 @@
+"""
+Point d'entrée `python -m FlowTag_Pro` (mode ligne de commande)
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Mode ligne de commande de FlowTag Pro (sans interface Tk)
+Pour les analyses batch sur serveur, en SSH ou depuis cron
+
+Usage :
+    python -m FlowTag_Pro analyze <fichiers|dossiers...> --jobs 8 --write --out results.jsonl
+    python -m FlowTag_Pro watch <dossiers...> --write --out results.jsonl
+    python -m FlowTag_Pro resume --write --out results.jsonl
+    python -m FlowTag_Pro classify results.jsonl --out classification.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .services.analysis_orchestrator import AnalysisOrchestrator
+from .services.artwork_store import ArtworkBlob
+from .services.folder_watcher import FolderWatcher
+from .services.library_scanner import LibraryScanner
+from .services.quota_ledger import QuotaExhaustedError
+from .services.rules_engine import RulesClassifier
+from .services.tag_writer import TagWriter
+
+
+def _json_default(value: Any) -> Any:
+    """Sérialise les valeurs non JSON (pochettes, dates...)"""
+    if isinstance(value, ArtworkBlob):
+        return {'sha256': value.sha256, 'size': value.size}
+    if isinstance(value, bytes):
+        return None
+    return str(value)
+
+
+def _percentile(values: List[float], ratio: float) -> float:
+    """Percentile simple (valeurs triées, plus proche rang)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+
+class ResultSink:
+    """Écrit les résultats en JSONL au fil de l'eau et tient les statistiques du run"""
+
+    def __init__(self, orchestrator: AnalysisOrchestrator, out_path: str, write_tags: bool,
+                 on_written: Optional[Callable[[str], None]] = None):
+        self.orchestrator = orchestrator
+        # Appelé après chaque écriture de tags (le watcher ignore alors l'événement)
+        self.on_written = on_written
+        self.out = open(out_path, 'a', encoding='utf-8')
+        self.tag_writer = TagWriter() if write_tags else None
+        self.started = time.monotonic()
+        self.latencies: List[float] = []
+        self.counts = {'ok': 0, 'error': 0, 'deferred': 0, 'written': 0, 'write_failed': 0}
+
+    async def handle(self, file_path: str, result: Any) -> None:
+        """Traite un résultat : écriture des tags (optionnelle) puis ligne JSONL"""
+        latency = self.orchestrator.latencies.pop(file_path, None)
+        if latency is not None:
+            self.latencies.append(latency)
+
+        record: Dict[str, Any] = {'file': file_path, 'latency_s': round(latency, 3) if latency else None}
+
+        if isinstance(result, QuotaExhaustedError):
+            # Repris plus tard par la commande resume
+            self.counts['deferred'] += 1
+            record.update({'status': 'deferred', 'resume_day': result.resume_day})
+        elif isinstance(result, Exception):
+            self.counts['error'] += 1
+            record.update({'status': 'error', 'error': str(result)})
+        else:
+            self.counts['ok'] += 1
+            record.update({'status': 'ok', 'analysis': result})
+
+            if self.tag_writer:
+                record['written'] = await self._write_tags(file_path, result)
+
+        self.out.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+        self.out.flush()
+
+    async def _write_tags(self, file_path: str, analysis: Dict[str, Any]) -> bool:
+        """Écrit les tags dans un thread pour ne pas bloquer le pipeline"""
+        try:
+            await asyncio.to_thread(
+                self.tag_writer.write_tags,
+                file_path,
+                self.tag_writer.build_tags(analysis),
+                analysis.get('artwork_bytes')
+            )
+            self.counts['written'] += 1
+            if self.on_written:
+                self.on_written(file_path)
+            return True
+        except Exception as e:
+            print(f"❌ Tags non écrits pour {file_path}: {e}")
+            self.counts['write_failed'] += 1
+            return False
+
+    def summary(self) -> None:
+        """Affiche le débit et la latence du run"""
+        self.out.close()
+        elapsed = time.monotonic() - self.started
+        total = self.counts['ok'] + self.counts['error'] + self.counts['deferred']
+
+        print("\n" + "=" * 60)
+        print("📊 Résumé du batch")
+        print("=" * 60)
+        print(f"  Morceaux : {total} ({self.counts['ok']} ok, {self.counts['error']} en erreur, "
+              f"{self.counts['deferred']} reportés)")
+        if self.tag_writer:
+            print(f"  Tags écrits : {self.counts['written']} ({self.counts['write_failed']} échecs)")
+        print(f"  Durée : {elapsed:.1f}s")
+        if elapsed > 0:
+            print(f"  Débit : {total / elapsed * 60:.1f} morceaux/min")
+        if self.latencies:
+            print(f"  Latence : p50 {_percentile(self.latencies, 0.5):.2f}s | "
+                  f"p95 {_percentile(self.latencies, 0.95):.2f}s | max {max(self.latencies):.2f}s")
+
+
+async def _run_analyze(args: argparse.Namespace) -> None:
+    """Commande analyze : analyse un lot de fichiers/dossiers"""
+    orchestrator = _build_orchestrator(args.jobs, args.ai_batch, args.audio_workers)
+
+    # Dossiers : rescan incrémental (manifeste) ; fichiers isolés : analyse directe
+    roots = [path for path in args.paths if os.path.isdir(path)]
+    file_paths = LibraryScanner().scan([path for path in args.paths if not os.path.isdir(path)])
+    sources = [orchestrator.analyze_library(root) for root in roots]
+    if file_paths:
+        print(f"🎵 {len(file_paths)} fichiers à analyser")
+        sources.append(orchestrator.analyze_many(file_paths))
+
+    sink = ResultSink(orchestrator, args.out, args.write)
+    try:
+        for source in sources:
+            async for file_path, result in source:
+                await sink.handle(file_path, result)
+    finally:
+        await orchestrator.close()
+        sink.summary()
+
+
+async def _run_resume(args: argparse.Namespace) -> None:
+    """Commande resume : reprend les morceaux reportés faute de quota"""
+    orchestrator = _build_orchestrator(args.jobs, args.ai_batch, args.audio_workers)
+    sink = ResultSink(orchestrator, args.out, args.write)
+    try:
+        async for file_path, result in orchestrator.resume_deferred():
+            await sink.handle(file_path, result)
+    finally:
+        await orchestrator.close()
+        sink.summary()
+
+
+async def _run_watch(args: argparse.Namespace) -> None:
+    """Commande watch : analyse les nouveaux fichiers des dossiers surveillés"""
+    orchestrator = _build_orchestrator(args.jobs, args.ai_batch, args.audio_workers)
+    sink = ResultSink(orchestrator, args.out, args.write)
+    watcher = FolderWatcher(
+        orchestrator, args.paths,
+        settle_seconds=args.settle,
+        on_result=sink.handle
+    )
+    sink.on_written = watcher.mark_written
+    try:
+        await watcher.run()
+    finally:
+        await orchestrator.close()
+        sink.summary()
+
+
+async def _run_classify(args: argparse.Namespace) -> None:
+    """Commande classify : re-score une bibliothèque analysée selon rules.yaml (sans appel API)"""
+    classifier = RulesClassifier(min_score=args.min_score)
+    if not classifier.available:
+        print("❌ numpy est requis pour la classification par règles")
+        return
+
+    files, analyses = [], []
+    for results_path in args.paths:
+        with open(results_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('status') == 'ok':
+                    files.append(record['file'])
+                    analyses.append(record['analysis'])
+
+    started = time.monotonic()
+    ranked = classifier.classify_many(analyses)
+    print(f"🧮 {len(analyses)} morceaux classés en {time.monotonic() - started:.2f}s")
+
+    with open(args.out, 'w', encoding='utf-8') as out:
+        for file_path, tags in zip(files, ranked):
+            out.write(json.dumps({'file': file_path, **tags}, ensure_ascii=False) + '\n')
+    print(f"✅ Résultats écrits dans {args.out}")
+
+
+def _build_orchestrator(jobs: int, ai_batch: int, audio_workers: Optional[int] = None) -> AnalysisOrchestrator:
+    """Orchestrateur dimensionné selon --jobs, --ai-batch et --audio-workers"""
+    return AnalysisOrchestrator(
+        spotify_workers=jobs,
+        discogs_workers=max(1, jobs // 2),
+        ai_workers=max(1, jobs // 2),
+        ai_batch_size=ai_batch,
+        queue_size=jobs * 4,
+        audio_workers=audio_workers
+    )
+
+
+def _load_env() -> None:
+    """Charge le .env si python-dotenv est disponible"""
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m FlowTag_Pro', description="FloTag Pro en mode batch (sans interface)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in (('analyze', "Analyse des fichiers ou dossiers"),
+                            ('watch', "Surveille des dossiers et analyse les nouveaux morceaux"),
+                            ('resume', "Reprend les morceaux reportés faute de quota")):
+        sub = subparsers.add_parser(name, help=help_text)
+        if name != 'resume':
+            sub.add_argument('paths', nargs='+', help="Fichiers audio ou dossiers")
+        sub.add_argument('--jobs', '-j', type=int, default=4, help="Requêtes simultanées par service (défaut : 4)")
+        sub.add_argument('--ai-batch', type=int, default=10,
+                         help="Morceaux par requête Gemini (défaut : 10, 1 = sans regroupement)")
+        sub.add_argument('--audio-workers', type=int, default=None,
+                         help="Processus d'analyse audio locale (défaut : nombre de cœurs)")
+        sub.add_argument('--write', action='store_true', help="Écrire les tags dans les fichiers")
+        sub.add_argument('--out', '-o', default='results.jsonl', help="Fichier JSONL de sortie (défaut : results.jsonl)")
+        if name == 'watch':
+            sub.add_argument('--settle', type=float, default=5.0,
+                             help="Secondes de stabilité avant de traiter un fichier (défaut : 5)")
+
+    classify = subparsers.add_parser('classify', help="Score contextes et moments (rules.yaml) de résultats JSONL")
+    classify.add_argument('paths', nargs='+', help="Fichiers JSONL produits par analyze/watch/resume")
+    classify.add_argument('--min-score', type=float, default=0.5, help="Score minimum d'un tag (défaut : 0.5)")
+    classify.add_argument('--out', '-o', default='classification.jsonl',
+                          help="Fichier JSONL de sortie (défaut : classification.jsonl)")
+
+    args = parser.parse_args(argv)
+    _load_env()
+
+    runner = {
+        'analyze': _run_analyze, 'watch': _run_watch, 'resume': _run_resume, 'classify': _run_classify
+    }[args.command]
+    try:
+        asyncio.run(runner(args))
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrompu")
+        return 130
+    return 0
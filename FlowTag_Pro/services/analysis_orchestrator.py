@@ -5,30 +5,89 @@ Version mise à jour avec SpotifyAsyncService
 """
 
 import asyncio
-from typing import Dict, Any, Optional, List
+import os
+from datetime import timedelta
+from typing import Dict, Any, Optional, List, Iterable, AsyncIterator, Tuple
 from pathlib import Path
 import aiofiles
 from mutagen import File as MutagenFile
 
+from .artist_store import ArtistStore
+from .audio_analyzer import LocalAudioAnalyzer, camelot_key
 from .cache_manager import CacheManager
 from .spotify_async import SpotifyAsyncService
 from .gemini_service import GeminiDiscogsService
 from .corrections_database import CorrectionsDatabase
-from ..data.countries_db import detect_country
+from .library_manifest import LibraryManifest, file_identity
+from .quota_ledger import QuotaExhaustedError, QuotaLedger
+from .single_flight import SingleFlight
 
 
 class AnalysisOrchestrator:
     """Orchestrateur principal coordonnant tous les services d'analyse"""
     
-    def __init__(self):
+    def __init__(self, spotify_workers: int = 4, discogs_workers: int = 2,
+                 ai_workers: int = 2, ai_batch_size: int = 10, queue_size: int = 32,
+                 spotify_batch_size: int = 100, batch_window: float = 5.0,
+                 stage_timeouts: Optional[Dict[str, float]] = None,
+                 track_timeout: float = 60.0, audio_workers: Optional[int] = None,
+                 partial_cache_duration: timedelta = timedelta(hours=1)):
         # Initialiser le cache manager
         self.cache_manager = CacheManager()
+        self.cache_manager.start_sweeper()  # Éviction/compactage en arrière-plan
+        
+        # Quotas d'API persistants, partagés par tous les services
+        self.quota_ledger = QuotaLedger()
+        
+        # Requêtes identiques en cours partagées entre morceaux (tous services)
+        self.single_flight = SingleFlight()
         
         # Initialiser les services
-        self.spotify_service = SpotifyAsyncService(self.cache_manager)
-        self.ai_service = GeminiDiscogsService(self.cache_manager)  # Utilise Gemini par défaut
+        self.spotify_service = SpotifyAsyncService(self.cache_manager, self.quota_ledger, self.single_flight)
+        self.ai_service = GeminiDiscogsService(  # Utilise Gemini par défaut
+            self.cache_manager, max_concurrent_requests=ai_workers, batch_size=ai_batch_size,
+            quota_ledger=self.quota_ledger, single_flight=self.single_flight
+        )
         self.corrections_db = CorrectionsDatabase()
         
+        # Faits par artiste (pays, genres Spotify) partagés par tous ses morceaux
+        self.artist_store = ArtistStore(corrections_db=self.corrections_db)
+        
+        # BPM/tonalité/énergie calculés localement quand Spotify n'a rien (un processus par cœur)
+        self.audio_analyzer = LocalAudioAnalyzer(self.cache_manager, max_workers=audio_workers)
+        
+        # Parallélisme du pipeline batch (analyze_many) : workers par étape
+        self.stage_workers = {
+            'metadata': 2,
+            'spotify': spotify_workers,
+            'spotify_batch': 1,
+            'audio': self.audio_analyzer.max_workers,
+            'discogs': discogs_workers,
+            # Assez de workers pour remplir les lots Gemini ; les requêtes
+            # simultanées restent bornées à ai_workers par le service
+            'ai': ai_workers * max(1, ai_batch_size),
+            'finalize': 1
+        }
+        self.queue_size = queue_size
+        
+        # Étapes par lots : taille maximale d'un lot et attente maximale pour le remplir
+        self.stage_batch_sizes = {'spotify_batch': spotify_batch_size}
+        self.batch_window = batch_window
+        
+        # Délais maximum (secondes) par étape réseau et par morceau
+        self.stage_timeouts = {'spotify': 20.0, 'discogs': 15.0, 'ai': 45.0}
+        self.stage_timeouts.update(stage_timeouts or {})
+        self.track_timeout = track_timeout
+        
+        # Analyse incomplète (étape hors délai) : gardée peu de temps en cache pour être refaite
+        self.partial_cache_duration = partial_cache_duration
+        
+        # Durée de traitement (s) des derniers morceaux sortis du pipeline
+        self.latencies: Dict[str, float] = {}
+        
+        # Identités de fichiers connues : chemin → ((taille, mtime), identité)
+        self._identities: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        
         # État des services
         self.services_status = self._check_services_status()
         
@@ -52,6 +111,11 @@ class AnalysisOrchestrator:
         else:
             print("❌ Mode DÉGRADÉ - Services limités")
             
+        # Analyse audio locale : complément optionnel, hors calcul du mode
+        status['local_audio'] = self.audio_analyzer.available
+        if not status['local_audio']:
+            print("ℹ️ librosa absent : BPM/tonalité uniquement depuis Spotify")
+            
         return status
         
     async def analyze_file(self, file_path: str) -> Dict[str, Any]:
@@ -61,17 +125,379 @@ class AnalysisOrchestrator:
         print("=" * 60)
         
         # Vérifier le cache complet d'abord
-        cache_key = f"full_analysis_v5_{Path(file_path).stem}"
+        cache_key = self._get_analysis_cache_key(file_path)
         cached_result = self.cache_manager.get_api_cache(cache_key, 'full_analysis')
         
         if cached_result:
             print("✅ Analyse complète trouvée dans le cache")
             return cached_result['response_data']
             
-        # 1. Extraire les métadonnées du fichier
+        # Quota IA épuisé : reporter plutôt que produire une analyse dégradée
+        await self._ensure_ai_budget(file_path)
+            
+        # 1-2. Métadonnées du fichier + corrections utilisateur
+        track_info, corrections = await self._prepare_track(file_path)
+            
+        # 3-4. Enrichissement Spotify et Discogs en parallèle
+        budget = {'remaining': self.track_timeout, 'timed_out': []}
+        spotify_data, discogs_data = await self._enrich_concurrently(track_info, budget)
+        
+        # Mesures locales si Spotify n'a pas d'audio features
+        track_info['audio_analysis'] = await self._analyze_audio(cache_key, track_info, spotify_data)
+        
+        # 5. Analyse IA pour le DJ
+        ai_analysis = await self._analyze_with_deadline(
+            track_info, spotify_data, discogs_data, budget
+        )
+        
+        # 6-7. Analyse finale, formatage Serato et cache
+        return self._finalize_analysis(
+            cache_key, track_info, corrections, spotify_data, discogs_data, ai_analysis,
+            budget['timed_out']
+        )
+        
+    async def analyze_many(self, file_paths: Iterable[str]) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Analyse un lot de fichiers sous forme de pipeline par étapes.
+        
+        Chaque étape (métadonnées, Spotify, Discogs, IA, finalisation) possède
+        sa propre file bornée et son propre nombre de workers : les attentes
+        réseau des différents morceaux se chevauchent au lieu de s'additionner,
+        et une étape lente freine les précédentes (backpressure) au lieu de
+        laisser les files grossir sans limite. L'étape spotify_batch traite
+        les morceaux par lots (features audio et pochettes en appels groupés).
+        
+        Args:
+            file_paths: Chemins des fichiers à analyser
+            
+        Yields:
+            Tuples (file_path, analyse) dans l'ordre de fin de traitement.
+            En cas d'échec, l'analyse est remplacée par l'exception levée.
+        """
+        stage_names = ['metadata', 'spotify', 'spotify_batch', 'audio', 'discogs', 'ai', 'finalize']
+        stages = [
+            (getattr(self, f'_stage_{name}'), self.stage_workers[name], self.stage_batch_sizes.get(name))
+            for name in stage_names
+        ]
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in stages]
+        results: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        
+        async def feed():
+            for file_path in file_paths:
+                await queues[0].put({'file_path': file_path})
+            for _ in range(stages[0][1]):
+                await queues[0].put(None)
+                
+        async def collect(inbox, batch_size):
+            """Premier job (attente libre), puis ceux qui arrivent pendant batch_window"""
+            job = await inbox.get()
+            if job is None or not batch_size:
+                return [job] if job else [], job is None
+            jobs = [job]
+            deadline = loop.time() + self.batch_window
+            while len(jobs) < batch_size and loop.time() < deadline:
+                if inbox.empty():
+                    await asyncio.sleep(min(0.05, deadline - loop.time()))
+                    continue
+                job = inbox.get_nowait()
+                if job is None:
+                    return jobs, True
+                jobs.append(job)
+            return jobs, False
+            
+        async def worker(stage, batch_size, inbox, outbox):
+            finished = False
+            while not finished:
+                jobs, finished = await collect(inbox, batch_size)
+                pending = [job for job in jobs if 'result' not in job and 'error' not in job]
+                if pending:
+                    try:
+                        # Une étape par lots reçoit la liste, les autres un job
+                        await stage(pending if batch_size else pending[0])
+                    except QuotaExhaustedError as e:
+                        for job in pending:
+                            job['error'] = e  # Morceau déjà mis en file de reprise
+                    except Exception as e:
+                        for job in pending:
+                            print(f"❌ Erreur analyse {job['file_path']}: {e}")
+                            job['error'] = e
+                for job in jobs:
+                    await outbox.put(job)
+                
+        async def run_stage(index):
+            stage, workers, batch_size = stages[index]
+            outbox = queues[index + 1] if index + 1 < len(stages) else results
+            await asyncio.gather(*(
+                worker(stage, batch_size, queues[index], outbox) for _ in range(workers)
+            ))
+            # Propager la fin de flux à l'étape suivante
+            next_workers = stages[index + 1][1] if index + 1 < len(stages) else 1
+            for _ in range(next_workers):
+                await outbox.put(None)
+                
+        # Index des playlists construit avant le pipeline, hors des délais par morceau
+        if self.services_status['spotify']:
+            await self.spotify_service.ensure_playlist_index()
+            
+        tasks = [asyncio.create_task(feed())]
+        tasks.extend(asyncio.create_task(run_stage(i)) for i in range(len(stages)))
+        
+        try:
+            while True:
+                job = await results.get()
+                if job is None:
+                    break
+                if 'started' in job:
+                    self.latencies[job['file_path']] = asyncio.get_running_loop().time() - job['started']
+                yield job['file_path'], job.get('result', job.get('error'))
+            await asyncio.gather(*tasks)
+            # Regroupements des étapes suivant le dernier lot (Discogs, pochettes)
+            self.single_flight.print_stats("Fin du pipeline")
+        finally:
+            for task in tasks:
+                task.cancel()
+                
+    async def _stage_metadata(self, job: Dict[str, Any]) -> None:
+        """Étape pipeline : cache complet, métadonnées et corrections"""
+        job['started'] = asyncio.get_running_loop().time()
+        job['cache_key'] = self._get_analysis_cache_key(job['file_path'])
+        cached_result = self.cache_manager.get_api_cache(job['cache_key'], 'full_analysis')
+        
+        if cached_result:
+            job['result'] = cached_result['response_data']
+            return
+            
+        await self._ensure_ai_budget(job['file_path'])
+        job['track_info'], job['corrections'] = await self._prepare_track(job['file_path'])
+        job['budget'] = {'remaining': self.track_timeout, 'timed_out': []}
+        
+    async def _stage_spotify(self, job: Dict[str, Any]) -> None:
+        """Étape pipeline : recherche Spotify (features et pochette viennent par lots ensuite)"""
+        job['spotify_data'] = await self._run_with_deadline(
+            self._enrich_with_spotify(job['track_info'], batched=True), 'spotify', job['budget'], {}
+        )
+        
+    async def _stage_spotify_batch(self, jobs: List[Dict[str, Any]]) -> None:
+        """
+        Étape pipeline par lots : features audio (100 IDs par appel) et
+        pochettes manquantes (50 tracks par appel) pour tous les morceaux du lot.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        found = [job for job in jobs if job['spotify_data'].get('spotify_track')]
+        
+        if found:
+            features = await self.spotify_service.get_audio_features_many(
+                [job['spotify_data']['spotify_track']['id'] for job in found]
+            )
+            for job in found:
+                spotify_track = job['spotify_data']['spotify_track']
+                spotify_track.update(features.get(spotify_track['id'], {}))
+                
+            # Artistes inconnus de la base (50 IDs par appel)
+            await self._refresh_artists([job['spotify_data']['spotify_track'] for job in found])
+                
+            # Pochettes : les fichiers sans artwork intégré. L'URL vient du
+            # résultat de recherche ; seuls les anciens résultats sans le champ
+            # album_art demandent les tracks (lots de 50)
+            need_artwork = [job for job in found if not job['track_info'].get('artwork_bytes')]
+            if need_artwork:
+                unknown = [
+                    job['spotify_data']['spotify_track']['id'] for job in need_artwork
+                    if 'album_art' not in job['spotify_data']['spotify_track']
+                ]
+                tracks = await self.spotify_service.get_tracks_many(unknown) if unknown else {}
+                urls = {
+                    job['file_path']: job['spotify_data']['spotify_track'].get('album_art')
+                    or tracks.get(job['spotify_data']['spotify_track']['id'], {}).get('album_art')
+                    for job in need_artwork
+                }
+                with_art = [job for job in need_artwork if urls[job['file_path']]]
+                images = await asyncio.gather(*(
+                    self.spotify_service.download_image(urls[job['file_path']]) for job in with_art
+                ))
+                for job, artwork in zip(with_art, images):
+                    if artwork:
+                        job['track_info']['artwork_bytes'] = artwork
+                        
+        # Bilan des appels Spotify du lot (recherches comprises) et des requêtes regroupées
+        self.spotify_service._print_call_stats(f"lot de {len(jobs)} morceaux")
+        self.single_flight.print_stats(f"Lot de {len(jobs)} morceaux")
+        
+        # Le temps passé à attendre le lot est décompté du budget de chaque morceau
+        elapsed = loop.time() - start
+        for job in jobs:
+            job['budget']['remaining'] -= elapsed
+        
+    async def _stage_audio(self, job: Dict[str, Any]) -> None:
+        """Étape pipeline : analyse audio locale des morceaux sans features Spotify"""
+        job['track_info']['audio_analysis'] = await self._analyze_audio(
+            job['cache_key'], job['track_info'], job['spotify_data']
+        )
+        
+    async def _stage_discogs(self, job: Dict[str, Any]) -> None:
+        """Étape pipeline : enrichissement Discogs"""
+        job['discogs_data'] = await self._run_with_deadline(
+            self._enrich_with_discogs(job['track_info']), 'discogs', job['budget'], {}
+        )
+        
+    async def _stage_ai(self, job: Dict[str, Any]) -> None:
+        """Étape pipeline : analyse IA"""
+        job['ai_analysis'] = await self._analyze_with_deadline(
+            job['track_info'], job['spotify_data'], job['discogs_data'], job['budget']
+        )
+        
+    async def _stage_finalize(self, job: Dict[str, Any]) -> None:
+        """Étape pipeline : analyse finale et mise en cache"""
+        job['result'] = self._finalize_analysis(
+            job['cache_key'], job['track_info'], job['corrections'],
+            job['spotify_data'], job['discogs_data'], job['ai_analysis'],
+            job['budget']['timed_out']
+        )
+        
+    async def _enrich_concurrently(self, track_info: Dict[str, Any],
+                                   budget: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Lance Spotify et Discogs en parallèle, chacun avec son propre délai"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        
+        # Chaque branche reçoit son délai, borné par le budget restant du morceau
+        # (copies du budget, mais liste des étapes hors délai partagée)
+        spotify_data, discogs_data = await asyncio.gather(
+            self._run_with_deadline(self._enrich_with_spotify(track_info), 'spotify', dict(budget), {}),
+            self._run_with_deadline(self._enrich_with_discogs(track_info), 'discogs', dict(budget), {})
+        )
+        
+        budget['remaining'] -= loop.time() - start
+        return spotify_data, discogs_data
+        
+    async def _analyze_with_deadline(self, track_info: Dict[str, Any],
+                                     spotify_data: Dict[str, Any],
+                                     discogs_data: Dict[str, Any],
+                                     budget: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyse IA bornée dans le temps, avec repli sur l'analyse de secours"""
+        # Pays et genres de l'artiste pour le prompt
+        track_info['artist_facts'] = self._artist_facts(track_info, spotify_data)
+        try:
+            # Créneau RPM attendu hors délai : le délai IA ne mesure que l'analyse
+            if self.services_status['gemini']:
+                await self.ai_service.wait_for_quota(track_info)
+            ai_analysis = await self._run_with_deadline(
+                self._analyze_with_ai(track_info, spotify_data, discogs_data), 'ai', budget, None
+            )
+        except QuotaExhaustedError as e:
+            await self._defer(track_info['file_path'], e)
+            raise
+        
+        if ai_analysis is None:
+            return self.ai_service._fallback_analysis(track_info, spotify_data)
+        return ai_analysis
+        
+    async def _ensure_ai_budget(self, file_path: str) -> None:
+        """Reporte le morceau (QuotaExhaustedError) si le quota IA du jour est épuisé"""
+        if not self.services_status['gemini']:
+            return
+        try:
+            self.quota_ledger.ensure_budget('gemini')
+        except QuotaExhaustedError as e:
+            await self._defer(file_path, e)
+            raise
+            
+    async def _defer(self, file_path: str, error: QuotaExhaustedError) -> None:
+        """Met le morceau en file « reprise demain »"""
+        await self.quota_ledger.defer_async(file_path, error.provider, error.resume_day)
+        print(f"  ⏸️ {Path(file_path).name} : quota {error.provider} épuisé, reprise le {error.resume_day}")
+        
+    async def _run_with_deadline(self, coro, stage: str, budget: Dict[str, Any], default: Any) -> Any:
+        """
+        Exécute une étape avec son délai propre, borné par le budget restant du morceau.
+        
+        Si le délai est dépassé, l'étape est abandonnée et `default` est retourné
+        pour que le morceau continue avec des données partielles ; l'étape est
+        notée dans `budget['timed_out']`. Le temps passé est décompté de
+        `budget['remaining']`.
+        """
+        timeout = max(0.0, min(self.stage_timeouts[stage], budget['remaining']))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        
+        try:
+            return await asyncio.wait_for(coro, timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"  ⏱️ {stage} : délai dépassé ({timeout:.1f}s), données partielles")
+            budget['timed_out'].append(stage)
+            return default
+        finally:
+            budget['remaining'] -= loop.time() - start
+            
+    async def analyze_library(self, root: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Rescan incrémental d'une bibliothèque : seuls les fichiers nouveaux,
+        modifiés ou pas encore analysés passent dans le pipeline.
+        
+        Args:
+            root: Dossier racine de la bibliothèque
+            
+        Yields:
+            Tuples (file_path, analyse ou exception), comme analyze_many
+        """
+        manifest = LibraryManifest(root)
+        diff = manifest.rescan()
+        print(f"📚 Bibliothèque {root} : {len(diff['new'])} nouveaux, {len(diff['changed'])} modifiés, "
+              f"{len(diff['unchanged'])} inchangés, {len(diff['removed'])} supprimés")
+        
+        # Réutiliser les identités du manifeste (pas de re-hachage)
+        for file_path in diff['to_analyze']:
+            entry = manifest.files[file_path]
+            self._identities[file_path] = ((entry['size'], entry['mtime_ns']), entry['identity'])
+        
+        try:
+            async for file_path, result in self.analyze_many(diff['to_analyze']):
+                # Une analyse partielle (délai dépassé) sera refaite au prochain rescan
+                if not isinstance(result, Exception) and not result.get('partial_stages'):
+                    manifest.mark_analyzed(file_path)
+                yield file_path, result
+        finally:
+            manifest.save()
+        
+    async def resume_deferred(self) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Reprend les morceaux reportés faute de quota dont la date de reprise est atteinte.
+        
+        Yields:
+            Tuples (file_path, analyse ou exception), comme analyze_many
+        """
+        due = self.quota_ledger.get_due()
+        print(f"⏯️ {len(due)} morceau(x) reporté(s) à reprendre")
+        
+        async for file_path, result in self.analyze_many(due):
+            # Un nouvel épuisement du quota remet le morceau en file
+            if not isinstance(result, QuotaExhaustedError):
+                await self.quota_ledger.resolve_async(file_path)
+            yield file_path, result
+        
+    def _get_analysis_cache_key(self, file_path: str) -> str:
+        """Clé de cache de l'analyse complète d'un fichier (identité du contenu)"""
+        try:
+            stat = os.stat(file_path)
+            known = self._identities.get(file_path)
+            
+            if known and known[0] == (stat.st_size, stat.st_mtime_ns):
+                identity = known[1]
+            else:
+                identity = file_identity(file_path, stat)
+                self._identities[file_path] = ((stat.st_size, stat.st_mtime_ns), identity)
+                
+            return f"full_analysis_v6_{identity}"
+        except OSError:
+            # Fichier illisible : clé basée sur le chemin complet
+            return f"full_analysis_v6_path_{os.path.abspath(file_path)}"
+        
+    async def _prepare_track(self, file_path: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Extrait les métadonnées et applique les corrections utilisateur"""
         track_info = await self._extract_file_metadata(file_path)
         
-        # 2. Vérifier les corrections utilisateur
         corrections = self.corrections_db.get_corrections(
             track_info.get('artist', ''),
             track_info.get('title', '')
@@ -81,28 +507,39 @@ class AnalysisOrchestrator:
             print(f"✅ Corrections trouvées : {len(corrections)} entrées")
             track_info.update(corrections)
             
-        # 3. Enrichissement Spotify
-        spotify_data = await self._enrich_with_spotify(track_info)
-        
-        # 4. Enrichissement Discogs
-        discogs_data = await self._enrich_with_discogs(track_info)
-        
-        # 5. Analyse IA pour le DJ
-        ai_analysis = await self._analyze_with_ai(track_info, spotify_data, discogs_data)
-        
-        # 6. Générer l'analyse finale
+        return track_info, corrections
+        
+    def _finalize_analysis(self, cache_key: str,
+                           track_info: Dict[str, Any],
+                           corrections: Optional[Dict[str, Any]],
+                           spotify_data: Dict[str, Any],
+                           discogs_data: Dict[str, Any],
+                           ai_analysis: Dict[str, Any],
+                           timed_out: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Combine les sources, formate pour Serato et sauvegarde dans le cache.
+        
+        Une analyse dont une étape a dépassé son délai est marquée partielle
+        (`partial_stages`) et n'est gardée que `partial_cache_duration` : un
+        ralentissement passager ne fige pas des tags incomplets pour 7 jours.
+        """
         final_analysis = self._generate_final_analysis(
             track_info, spotify_data, discogs_data, ai_analysis
         )
         
-        # 7. Formater les tags pour Serato
         final_analysis = self._format_tags_for_serato(final_analysis)
         
         # Afficher le résumé
         self._print_analysis_summary(final_analysis)
         
         # Sauvegarder dans le cache
-        self.cache_manager.save_api_cache(cache_key, 'full_analysis', final_analysis)
+        if timed_out:
+            final_analysis['partial_stages'] = sorted(set(timed_out))
+            self.cache_manager.save_api_cache(
+                cache_key, 'full_analysis', final_analysis, duration=self.partial_cache_duration
+            )
+        else:
+            self.cache_manager.save_api_cache(cache_key, 'full_analysis', final_analysis)
         
         # Stats
         print(f"\n📊 Statistiques :")
@@ -142,6 +579,10 @@ class AnalysisOrchestrator:
                 'key': ''
             }
             
+            # Durée du fichier (départage les versions lors de la recherche Spotify)
+            if getattr(audio_file, 'info', None) and getattr(audio_file.info, 'length', None):
+                tags['duration_ms'] = int(audio_file.info.length * 1000)
+                
             # Mapping des tags selon le format
             if hasattr(audio_file, 'tags') and audio_file.tags:
                 # MP3 ID3
@@ -218,8 +659,14 @@ class AnalysisOrchestrator:
         except Exception:
             return None
             
-    async def _enrich_with_spotify(self, track_info: Dict[str, Any]) -> Dict[str, Any]:
-        """Enrichit les données avec Spotify"""
+    async def _enrich_with_spotify(self, track_info: Dict[str, Any], batched: bool = False) -> Dict[str, Any]:
+        """
+        Enrichit les données avec Spotify.
+        
+        Args:
+            batched: Ne pas récupérer features audio ni pochette (faits par
+                lots dans l'étape spotify_batch du pipeline)
+        """
         if not self.services_status['spotify']:
             return {}
             
@@ -228,7 +675,9 @@ class AnalysisOrchestrator:
         # Rechercher le track
         spotify_track = await self.spotify_service.search_track(
             track_info.get('title', ''),
-            track_info.get('artist', '')
+            track_info.get('artist', ''),
+            with_features=not batched,
+            duration_ms=track_info.get('duration_ms')
         )
         
         if not spotify_track:
@@ -240,9 +689,13 @@ class AnalysisOrchestrator:
             spotify_track['id']
         )
         
+        # Hors pipeline : l'artiste est ajouté à la base tout de suite
+        if not batched:
+            await self._refresh_artists([spotify_track])
+            
         # Récupérer l'artwork si pas déjà présent
-        if not track_info.get('artwork_bytes') and spotify_track.get('album_art'):
-            artwork = await self.spotify_service.get_track_artwork(spotify_track['id'])
+        if not batched and not track_info.get('artwork_bytes') and spotify_track.get('album_art'):
+            artwork = await self.spotify_service.get_track_artwork(spotify_track['id'], spotify_track['album_art'])
             if artwork:
                 track_info['artwork_bytes'] = artwork
                 
@@ -254,6 +707,30 @@ class AnalysisOrchestrator:
             'confidence': contexts_analysis.get('confidence', 0)
         }
         
+    async def _analyze_audio(self, cache_key: str, track_info: Dict[str, Any],
+                             spotify_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Tempo, tonalité et énergie calculés depuis le fichier quand Spotify n'a rien"""
+        if (spotify_data.get('spotify_track') or {}).get('tempo') or not self.services_status['local_audio']:
+            return None
+        return await self.audio_analyzer.analyze(track_info['file_path'], cache_key)
+        
+    async def _refresh_artists(self, spotify_tracks: List[Dict[str, Any]]) -> None:
+        """Ajoute à la base les artistes principaux inconnus ou périmés"""
+        missing = self.artist_store.missing_ids(track.get('artist_id') for track in spotify_tracks)
+        if missing:
+            self.artist_store.update_from_spotify(
+                await self.spotify_service.get_artists_many(missing), requested=missing
+            )
+            await self.artist_store.save_async()
+            
+    def _artist_facts(self, track_info: Dict[str, Any], spotify_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Faits de l'artiste principal (lecture locale, sans appel réseau)"""
+        spotify_track = spotify_data.get('spotify_track') or {}
+        return self.artist_store.get(
+            spotify_track.get('artist') or track_info.get('artist', ''),
+            spotify_track.get('artist_id')
+        )
+        
     async def _enrich_with_discogs(self, track_info: Dict[str, Any]) -> Dict[str, Any]:
         """Enrichit les données avec Discogs"""
         if not self.services_status['discogs']:
@@ -292,6 +769,8 @@ class AnalysisOrchestrator:
         
         # Base avec les infos du fichier
         final = track_info.copy()
+        artist_facts = final.pop('artist_facts', None) or self._artist_facts(track_info, spotify_data)
+        audio_analysis = final.pop('audio_analysis', None)
         
         # Ajouter/mettre à jour avec Spotify
         if spotify_data.get('spotify_track'):
@@ -310,6 +789,18 @@ class AnalysisOrchestrator:
                 'valence': spotify_track.get('valence', 0)
             })
             
+        # Mesures locales quand Spotify n'a pas d'audio features
+        if audio_analysis and not final.get('tempo'):
+            final['tempo'] = audio_analysis['tempo']
+            final['energy_raw'] = audio_analysis['energy']
+            
+        # Tonalité mesurée : Spotify (classe de hauteur + mode), sinon analyse locale
+        spotify_track = spotify_data.get('spotify_track') or {}
+        if spotify_track.get('tempo') and spotify_track.get('key') in range(12):
+            measured_key = camelot_key(spotify_track['key'], spotify_track.get('mode') == 0)
+        else:
+            measured_key = audio_analysis['key'] if audio_analysis else None
+            
         # Ajouter les infos Discogs
         if discogs_data:
             final['year'] = discogs_data.get('year') or final.get('year', '')
@@ -319,12 +810,19 @@ class AnalysisOrchestrator:
         # Ajouter l'analyse IA
         if ai_analysis:
             final['genre'] = ai_analysis.get('genre') or final.get('genre', '')
-            final['bpm'] = ai_analysis.get('bpm') or final.get('tempo')
-            final['key'] = ai_analysis.get('key') or final.get('key', '')
+            final['key'] = final.get('key') or ai_analysis.get('key') or ''
             final['energy'] = ai_analysis.get('energy', 5)
             final['mood'] = ai_analysis.get('mood', '')
             final['dj_tips'] = ai_analysis.get('dj_tips', '')
             
+        # Valeurs mesurées (Spotify, puis analyse locale) avant les estimations de l'IA ;
+        # le tag de tonalité du fichier reste prioritaire
+        final['bpm'] = (self._as_bpm(final.get('tempo'))
+                        or self._as_bpm((ai_analysis or {}).get('bpm'))
+                        or self._as_bpm(final.get('bpm')))
+        if measured_key and not track_info.get('key'):
+            final['key'] = measured_key
+            
         # Contextes et styles (combiner toutes les sources)
         all_contexts = []
         all_styles = []
@@ -354,10 +852,10 @@ class AnalysisOrchestrator:
                     moments_set.add(pair[1].replace('#', ''))
             final['moments'] = list(moments_set)
             
-        # Détection du pays
-        country_info = detect_country(final.get('artist', ''))
-        final['country_code'] = country_info[0]
-        final['country_name'] = country_info[1]
+        # Pays et genres de l'artiste (base d'artistes)
+        final['country_code'] = artist_facts['country_flag']
+        final['country_name'] = artist_facts['country_name']
+        final['artist_genres'] = artist_facts['genres']
         
         # Tags pour commentaires et grouping
         final['comment_tags'] = []
@@ -365,6 +863,15 @@ class AnalysisOrchestrator:
         
         return final
         
+    @staticmethod
+    def _as_bpm(value: Any) -> Optional[float]:
+        """Convertit un BPM (nombre ou tag TBPM texte) en float, None si illisible"""
+        try:
+            bpm = float(str(value).strip().replace(',', '.'))
+        except (TypeError, ValueError):
+            return None
+        return bpm if bpm > 0 else None
+        
     def _format_tags_for_serato(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Formate les tags spécifiquement pour Serato DJ"""
         
@@ -432,7 +939,7 @@ class AnalysisOrchestrator:
         print(f"  🎸 Genre: {analysis.get('genre', 'Unknown')}")
         
         # Infos techniques
-        tempo = analysis.get('bpm') or analysis.get('tempo')
+        tempo = self._as_bpm(analysis.get('bpm')) or self._as_bpm(analysis.get('tempo'))
         if tempo:
             print(f"  🎹 BPM: {tempo:.0f} | Key: {analysis.get('key', 'Unknown')} | Energy: {analysis.get('energy', 5)}/10")
         
@@ -461,6 +968,9 @@ class AnalysisOrchestrator:
         stats = {
             'services_status': self.services_status,
             'cache_size': self.cache_manager.get_cache_size(),
+            'memory_cache': self.cache_manager.get_memory_stats(),
+            'quotas': self.quota_ledger.get_stats(),
+            'artists': self.artist_store.get_stats(),
             'corrections_count': len(self.corrections_db.corrections)
         }
         
@@ -468,4 +978,11 @@ class AnalysisOrchestrator:
         if hasattr(self.ai_service, 'get_usage_stats'):
             stats['ai_usage'] = self.ai_service.get_usage_stats()
             
-        return stats
\ No newline at end of file
+        return stats
+        
+    async def close(self) -> None:
+        """Ferme les sessions HTTP partagées (à appeler avant la fin de la boucle)"""
+        await self.ai_service.discogs_service.close()
+        await self.spotify_service.close()
+        self.audio_analyzer.close()
+        await self.artist_store.save_async()
@@ -0,0 +1,204 @@
+"""
+Base de connaissances par artiste pour FlowTag Pro
+Faits Spotify (genres, popularité) récupérés par lots, fusionnés avec les données locales
+"""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .track_matcher import normalize
+from ..data.countries_db import FLOWTAG_COUNTRIES, detect_country
+from ..data.genres_db import get_genre_contexts
+
+MAPPING_PAYS_PATH = Path(__file__).parent.parent / 'config' / 'mapping_pays.json'
+
+
+class ArtistStore:
+    """
+    Faits par artiste, calculés une fois et partagés par tous ses morceaux.
+
+    Une bibliothèque de 20 000 morceaux ne compte que quelques milliers
+    d'artistes : pays, genre et contextes suggérés sont résolus une fois par
+    artiste au lieu d'une fois par morceau.
+
+    - Les artistes Spotify (genres, popularité) sont persistés par ID et
+      rafraîchis après `max_age` ; seuls les IDs inconnus ou périmés sont
+      demandés à l'API (`missing_ids`, puis appels groupés de 50). Un ID
+      demandé mais non retourné est noté absent et n'est redemandé
+      qu'après `missing_max_age`.
+    - La base est écrite sur le disque dans un thread (`save_async`), hors
+      de la boucle d'événements.
+    - Pays et genre viennent, par priorité, de CorrectionsDatabase
+      (artist_database), de config/mapping_pays.json, puis de detect_country.
+    """
+
+    def __init__(self, store_path: Optional[Path] = None, corrections_db=None,
+                 mapping_path: Optional[Path] = None, max_age: timedelta = timedelta(days=30),
+                 missing_max_age: timedelta = timedelta(days=1)):
+        self.store_path = store_path or Path.home() / '.flotag_pro' / 'artists.json'
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        self.corrections_db = corrections_db
+        self.max_age = max_age
+        self.missing_max_age = missing_max_age
+        self.country_mapping = self._load_country_mapping(mapping_path or MAPPING_PAYS_PATH)
+        # Drapeau → nom du pays (la base d'artistes ne stocke que "PR 🇵🇷")
+        self._country_names = {}
+        for flag, name in FLOWTAG_COUNTRIES.values():
+            self._country_names.setdefault(flag, name)
+
+        self.artists: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, str] = {}
+        self._facts: Dict[tuple, Dict[str, Any]] = {}
+        self._dirty = False
+        self._save_lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _load_country_mapping(mapping_path: Path) -> Dict[str, List[str]]:
+        """Charge mapping_pays.json (clés normalisées)"""
+        try:
+            with open(mapping_path, 'r', encoding='utf-8') as f:
+                return {normalize(artist): country for artist, country in json.load(f).items()}
+        except Exception as e:
+            print(f"⚠️ Impossible de charger {mapping_path.name}: {e}")
+            return {}
+
+    def _load(self) -> None:
+        """Charge les artistes Spotify connus depuis le disque"""
+        if not self.store_path.exists():
+            return
+
+        try:
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                self.artists = json.load(f).get('artists', {})
+        except Exception as e:
+            print(f"⚠️ Base artistes illisible, reconstruction: {e}")
+            self.artists = {}
+
+        self._by_name = {
+            normalize(artist['name']): artist_id for artist_id, artist in self.artists.items()
+            if not artist.get('missing')
+        }
+
+    def save(self) -> None:
+        """Sauvegarde les artistes Spotify sur le disque (écriture atomique)"""
+        self._dirty = False
+        self._write(dict(self.artists))
+
+    async def save_async(self) -> None:
+        """Sauvegarde dans un thread (instantané pris sur la boucle, écriture hors boucle)"""
+        if self._dirty:
+            self._dirty = False
+            await asyncio.to_thread(self._write, dict(self.artists))
+
+    def _write(self, artists: Dict[str, Dict[str, Any]]) -> None:
+        with self._save_lock:
+            tmp_path = self.store_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'artists': artists}, f, ensure_ascii=False)
+            tmp_path.replace(self.store_path)
+
+    def missing_ids(self, artist_ids: Iterable[Optional[str]]) -> List[str]:
+        """IDs Spotify inconnus ou périmés (à demander à l'API)"""
+        now = datetime.now()
+        limit = (now - self.max_age).isoformat()
+        missing_limit = (now - self.missing_max_age).isoformat()
+        stale = []
+        for artist_id in dict.fromkeys(artist_ids):
+            if not artist_id:
+                continue
+            artist = self.artists.get(artist_id, {})
+            if artist.get('updated_at', '') < (missing_limit if artist.get('missing') else limit):
+                stale.append(artist_id)
+        return stale
+
+    def update_from_spotify(self, artists: Dict[str, Dict[str, Any]],
+                            requested: Iterable[str] = ()) -> None:
+        """
+        Enregistre des artistes Spotify (réponse de get_artists_many).
+
+        Args:
+            requested: IDs demandés ; ceux absents de la réponse sont notés
+                absents pour ne pas être redemandés à chaque lot
+        """
+        now = datetime.now()
+        for artist_id in requested:
+            if artist_id in artists:
+                continue
+            known = self.artists.get(artist_id, {})
+            if known.get('name'):
+                # Données connues conservées, nouvel essai après missing_max_age
+                retry_at = now - self.max_age + self.missing_max_age
+                self.artists[artist_id] = dict(known, updated_at=retry_at.isoformat())
+            else:
+                self.artists[artist_id] = {'missing': True, 'updated_at': now.isoformat()}
+            self._dirty = True
+        if not artists:
+            return
+
+        for artist_id, artist in artists.items():
+            self.artists[artist_id] = {
+                'name': artist.get('name', ''),
+                'genres': artist.get('genres', []),
+                'popularity': artist.get('popularity', 0),
+                'updated_at': now.isoformat()
+            }
+            self._by_name[normalize(artist.get('name', ''))] = artist_id
+
+        self._facts.clear()
+        self._dirty = True
+
+    def get(self, artist_name: str, spotify_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Faits fusionnés d'un artiste (mémorisés jusqu'à la prochaine mise à jour).
+
+        Returns:
+            name, spotify_id, genres (Spotify), popularity, genre, country_flag,
+            country_name, country_source et contexts (contextes suggérés)
+        """
+        key = normalize(artist_name)
+        memo_key = (key, spotify_id)
+        if memo_key in self._facts:
+            return self._facts[memo_key]
+
+        if spotify_id not in self.artists or self.artists[spotify_id].get('missing'):
+            spotify_id = self._by_name.get(key)
+        spotify = self.artists.get(spotify_id, {}) if spotify_id else {}
+        known = self.corrections_db.get_artist_info(artist_name) if self.corrections_db else None
+
+        # Pays : base d'artistes corrigée, puis mapping_pays.json, puis détection par nom
+        if known and known.get('country'):
+            flag = known['country'].split()[-1]
+            country, source = (flag, self._country_names.get(flag, known['country'])), 'corrections'
+        elif key in self.country_mapping:
+            country, source = tuple(self.country_mapping[key]), 'mapping'
+        else:
+            country, source = detect_country(artist_name), 'detected'
+
+        genre = (known or {}).get('genre') or next(iter(spotify.get('genres', [])), None)
+        facts = {
+            'name': spotify.get('name') or artist_name,
+            'spotify_id': spotify_id,
+            'genres': spotify.get('genres', []),
+            'popularity': spotify.get('popularity'),
+            'genre': genre,
+            'country_flag': country[0],
+            'country_name': country[1],
+            'country_source': source,
+            'contexts': get_genre_contexts(genre)
+        }
+        self._facts[memo_key] = facts
+        return facts
+
+    def get_stats(self) -> Dict[str, int]:
+        """Taille de la base"""
+        return {
+            'spotify_artists': sum(1 for artist in self.artists.values() if not artist.get('missing')),
+            'missing_artists': sum(1 for artist in self.artists.values() if artist.get('missing')),
+            'mapped_countries': len(self.country_mapping),
+            'memoized': len(self._facts)
+        }
@@ -0,0 +1,103 @@
+"""
+Stockage des pochettes par contenu (SHA-256) pour FlowTag Pro
+Chaque image n'est écrite qu'une fois, quel que soit le nombre de tracks qui l'utilisent
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+
+class ArtworkBlob:
+    """
+    Référence paresseuse vers une pochette du store.
+
+    Les octets ne sont lus sur le disque qu'au moment où on en a besoin
+    (`bytes(blob)`), par exemple par la vue détaillée ou le TagWriter.
+    """
+
+    def __init__(self, store: 'ArtworkStore', sha256: str, size: int = 0):
+        self.store = store
+        self.sha256 = sha256
+        self.size = size
+
+    def __bytes__(self) -> bytes:
+        data = self.store.get(self.sha256)
+        return data if data is not None else b''
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.store.exists(self.sha256)
+
+    def __repr__(self) -> str:
+        return f"ArtworkBlob({self.sha256[:12]}…, {self.size} octets)"
+
+
+class ArtworkStore:
+    """Store de pochettes adressé par SHA-256, dédupliqué et réparti sur deux niveaux de sous-dossiers"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root or Path.home() / '.flotag_pro' / 'artwork'
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, sha256: str) -> Path:
+        """Chemin d'un blob sur deux niveaux : <root>/ab/cd/abcdef…"""
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def put(self, data: bytes) -> ArtworkBlob:
+        """Enregistre une image (si absente) et retourne sa référence"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self._path(sha256)
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Écriture atomique : un lecteur ne voit jamais un fichier partiel
+            tmp_path = path.with_name(f"{sha256}.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            tmp_path.replace(path)
+        else:
+            # Rafraîchir la date : le compactage épargne les blobs utilisés récemment
+            os.utime(path)
+
+        return ArtworkBlob(self, sha256, len(data))
+
+    def ref(self, sha256: str, size: int = 0) -> ArtworkBlob:
+        """Retourne une référence paresseuse vers un blob existant"""
+        return ArtworkBlob(self, sha256, size)
+
+    def get(self, sha256: str) -> Optional[bytes]:
+        """Lit le contenu d'un blob"""
+        try:
+            return self._path(sha256).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, sha256: str) -> bool:
+        """Indique si un blob est présent"""
+        return self._path(sha256).exists()
+
+    def iter_blobs(self) -> Iterator[Tuple[str, int, float]]:
+        """Parcourt les blobs du store : (sha256, taille, mtime)"""
+        for path in self.root.glob('*/*/*'):
+            # Les écritures en cours (<sha>.<pid>.tmp) ne sont pas des blobs
+            if len(path.name) != 64:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path.name, stat.st_size, stat.st_mtime
+
+    def delete(self, sha256: str) -> int:
+        """Supprime un blob et retourne le nombre d'octets libérés"""
+        path = self._path(sha256)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            return size
+        except FileNotFoundError:
+            return 0
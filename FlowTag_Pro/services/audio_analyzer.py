@@ -0,0 +1,287 @@
+"""
+Analyse audio locale pour FlowTag Pro
+Tempo, tonalité Camelot et énergie calculés depuis le fichier (librosa)
+"""
+
+import asyncio
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .rules_config import get_analysis_params
+
+# librosa/numpy sont optionnels : sans eux, seules les données Spotify servent
+try:
+    import librosa
+    import numpy as np
+except ImportError:
+    librosa = None  # type: ignore
+    np = None  # type: ignore
+
+# soundfile (dépendance de librosa) permet l'accès direct aux fenêtres
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None  # type: ignore
+
+PITCH_CLASSES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+# Profils de tonalité de Krumhansl-Kessler (tonique en première position)
+MAJOR_PROFILE = [6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]
+MINOR_PROFILE = [6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17]
+
+# Numéro Camelot par tonique (C, C#, ..., B) : B = majeur, A = mineur
+CAMELOT_MAJOR = [8, 3, 10, 5, 12, 7, 2, 9, 4, 11, 6, 1]
+CAMELOT_MINOR = [5, 12, 7, 2, 9, 4, 11, 6, 1, 8, 3, 10]
+
+
+def camelot_key(tonic: int, minor: bool) -> str:
+    """Notation Camelot d'une tonalité (tonique 0-11 depuis C)"""
+    return f"{(CAMELOT_MINOR if minor else CAMELOT_MAJOR)[tonic]}{'A' if minor else 'B'}"
+
+
+def _bytes_per_second(params: Dict[str, Any]) -> float:
+    """
+    Estimation de la mémoire d'analyse par seconde de signal : échantillons float32 et STFT
+    complexe (n_fft/2+1 bins complex64 par trame), doublée pour les copies
+    intermédiaires (magnitude, mel, chroma).
+    """
+    per_sample = 4 + (params['n_fft'] // 2 + 1) * 8 / params['hop_length']
+    return params['sample_rate'] * per_sample * 2
+
+
+def plan_windows(duration: float, params: Dict[str, Any]) -> List[Tuple[float, float]]:
+    """
+    Fenêtres (début, durée) à décoder, en secondes.
+
+    La durée d'une fenêtre est bornée par `memory_budget_mb`, via une
+    estimation de la mémoire d'analyse (voir _bytes_per_second) : c'est un
+    ordre de grandeur, pas une limite garantie (décodeur, copies de librosa).
+    Un morceau court est découpé en fenêtres consécutives (couverture
+    complète) ; au-delà de trois fenêtres, seuls l'intro, le milieu et
+    l'outro sont décodés : la mémoire ne dépend plus de la durée du fichier.
+    """
+    budget_seconds = params['memory_budget_mb'] * 1024 * 1024 / _bytes_per_second(params)
+    window = max(1.0, min(params['window_seconds'], budget_seconds))
+
+    if duration <= 3 * window:
+        count = max(1, math.ceil(duration / window))
+        return [(index * window, min(window, duration - index * window)) for index in range(count)]
+    return [(0.0, window), ((duration - window) / 2, window), (duration - window, window)]
+
+
+def _iter_windows(file_path: str, duration: float, params: Dict[str, Any]) -> Iterator[Any]:
+    """
+    Décode les fenêtres une par une (seule la fenêtre courante est gardée).
+
+    Formats lus par soundfile (WAV, FLAC, AIFF, OGG, MP3 avec libsndfile
+    1.1+) : accès direct au début de chaque fenêtre, lue par blocs mixés en
+    mono. Autres formats (AAC/M4A via audioread) : librosa.load décode
+    depuis le début du fichier jusqu'à la fin de la fenêtre, en ne gardant
+    que la fenêtre ; plus lent sur un long fichier.
+    """
+    windows = plan_windows(duration, params)
+    sound_file = None
+    if sf is not None:
+        try:
+            sound_file = sf.SoundFile(file_path)
+        except RuntimeError:
+            pass  # Format non géré par libsndfile
+
+    if sound_file is None:
+        for offset, length in windows:
+            y, _ = librosa.load(
+                file_path, sr=params['sample_rate'], mono=True,
+                offset=offset, duration=length, dtype=np.float32
+            )
+            if len(y):
+                yield y
+        return
+
+    with sound_file:
+        native_sr = sound_file.samplerate
+        for offset, length in windows:
+            sound_file.seek(min(int(offset * native_sr), sound_file.frames))
+            blocks = [
+                block.mean(axis=1)
+                for block in sound_file.blocks(blocksize=64 * 1024, frames=int(length * native_sr),
+                                               dtype='float32', always_2d=True)
+            ]
+            if not blocks:
+                continue
+            y = np.concatenate(blocks)
+            if native_sr != params['sample_rate']:
+                y = librosa.resample(y, orig_sr=native_sr, target_sr=params['sample_rate'])
+            if len(y):
+                yield y
+
+
+def _detect_key(mean_chroma) -> Dict[str, Any]:
+    """Tonalité par corrélation du chroma moyen avec les 24 profils transposés"""
+    profiles = np.array(
+        [np.roll(MAJOR_PROFILE, tonic) for tonic in range(12)]
+        + [np.roll(MINOR_PROFILE, tonic) for tonic in range(12)]
+    )
+    profiles = (profiles - profiles.mean(axis=1, keepdims=True)) / profiles.std(axis=1, keepdims=True)
+    mean_chroma = (mean_chroma - mean_chroma.mean()) / (mean_chroma.std() or 1.0)
+
+    scores = profiles @ mean_chroma / 12
+    best = int(np.argmax(scores))
+    tonic, minor = best % 12, best >= 12
+    return {
+        'key': camelot_key(tonic, minor),
+        'key_name': f"{PITCH_CLASSES[tonic]} {'minor' if minor else 'major'}",
+        'key_confidence': round(float(scores[best]), 3)
+    }
+
+
+def _measure_window(y, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Mesures partielles d'une fenêtre (sommes et comptes, combinées ensuite)"""
+    sr, hop_length, n_fft = params['sample_rate'], params['hop_length'], params['n_fft']
+
+    # Tempo : enveloppe d'attaques (spectrogramme mel), ramené dans la plage DJ
+    onset_env = librosa.onset.onset_strength(
+        y=y, sr=sr, hop_length=hop_length, n_fft=n_fft, n_mels=params['n_mels']
+    )
+    tempo = float(np.atleast_1d(librosa.feature.rhythm.tempo(
+        onset_envelope=onset_env, sr=sr, hop_length=hop_length
+    ))[0])
+    low, high = params['bpm_range']
+    while 0 < tempo < low:
+        tempo *= 2
+    while tempo > high:
+        tempo /= 2
+
+    chroma = librosa.feature.chroma_stft(y=y, sr=sr, n_fft=n_fft, hop_length=hop_length)
+    rms = librosa.feature.rms(y=y, frame_length=n_fft, hop_length=hop_length)[0]
+    centroid = librosa.feature.spectral_centroid(y=y, sr=sr, n_fft=n_fft, hop_length=hop_length)[0]
+    onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr, hop_length=hop_length)
+
+    return {
+        'tempo': tempo,
+        'seconds': len(y) / sr,
+        'chroma_sum': chroma.sum(axis=1),
+        'frames': chroma.shape[1],
+        'rms_sum': float(rms.sum()),
+        'centroid_sum': float(centroid.sum()),
+        'onsets': len(onsets)
+    }
+
+
+def _combine(parts: List[Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    """Agrège les mesures des fenêtres en un résultat par morceau"""
+    frames = sum(part['frames'] for part in parts)
+    seconds = sum(part['seconds'] for part in parts)
+
+    # Tempo : médiane des fenêtres (une intro sans rythme ne l'emporte pas)
+    tempo = float(np.median([part['tempo'] for part in parts]))
+
+    # Énergie (0-1, échelle des audio features Spotify) : volume, brillance, densité d'attaques
+    loudness = float(20 * np.log10(sum(part['rms_sum'] for part in parts) / frames + 1e-10))
+    centroid = sum(part['centroid_sum'] for part in parts) / frames
+    onset_rate = sum(part['onsets'] for part in parts) / max(seconds, 1.0)
+    energy = (
+        0.5 * np.clip((loudness + 40) / 34, 0, 1)
+        + 0.25 * np.clip(centroid / 3000, 0, 1)
+        + 0.25 * np.clip(onset_rate / 4, 0, 1)
+    )
+
+    result = {
+        'tempo': round(tempo, 1),
+        'energy': round(float(energy), 3),
+        'loudness': round(loudness, 1),
+        'duration': round(duration, 1),
+        'analyzed_seconds': round(seconds, 1),
+        'source': 'local'
+    }
+    result.update(_detect_key(sum(part['chroma_sum'] for part in parts) / frames))
+    return result
+
+
+def analyze_audio_file(file_path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Analyse d'un fichier (exécutée dans un processus du pool).
+
+    Les fenêtres sont décodées et mesurées l'une après l'autre : le pic
+    mémoire est de l'ordre d'une fenêtre, quelle que soit la durée du
+    fichier (un set de 2 h coûte autant qu'un single de 3 min).
+
+    Returns:
+        tempo (BPM), key (Camelot), key_name, key_confidence, energy (0-1),
+        loudness (dBFS), duration (s), analyzed_seconds, source
+    """
+    duration = librosa.get_duration(path=file_path)
+    parts = [_measure_window(y, params) for y in _iter_windows(file_path, duration, params)]
+    if not parts:
+        raise ValueError("aucun signal décodé")
+    return _combine(parts, duration)
+
+
+class LocalAudioAnalyzer:
+    """
+    Moteur d'analyse audio locale (BPM, tonalité Camelot, énergie).
+
+    Sert quand Spotify n'a pas d'audio features (promos, white labels...).
+    Le calcul est purement CPU : il tourne dans un pool de processus
+    dimensionné au nombre de cœurs, hors de la boucle d'événements et
+    sans être freiné par le GIL. Chaque processus ne décode que des
+    fenêtres dimensionnées d'après une estimation de `memory_budget_mb`
+    (voir plan_windows) : le nombre de workers se règle sur les cœurs, pas
+    sur la durée des fichiers. Les
+    résultats sont mis en cache par identité de fichier.
+    """
+
+    def __init__(self, cache_manager=None, max_workers: Optional[int] = None,
+                 params: Optional[Dict[str, Any]] = None):
+        self.cache_manager = cache_manager
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.params = params or get_analysis_params()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        """librosa et numpy sont installés"""
+        return librosa is not None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Créé à la première analyse : pas de processus si tout vient de Spotify
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def analyze(self, file_path: str, cache_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Analyse un fichier dans le pool de processus.
+
+        Args:
+            cache_key: Clé d'identité du fichier (résultat mis en cache si fournie)
+
+        Returns:
+            Mesures locales, ou None si l'analyse est impossible
+        """
+        if not self.available:
+            return None
+
+        if cache_key and self.cache_manager:
+            cached = self.cache_manager.get_api_cache(cache_key, 'local_audio')
+            if cached:
+                return cached['response_data']
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._get_pool(), analyze_audio_file, file_path, self.params)
+        except Exception as e:
+            print(f"⚠️ Analyse audio locale impossible ({os.path.basename(file_path)}): {e}")
+            return None
+
+        if cache_key and self.cache_manager:
+            self.cache_manager.save_api_cache(cache_key, 'local_audio', result)
+        print(f"  🎚️ Analyse locale : {result['tempo']} BPM, {result['key']}, énergie {result['energy']:.2f}")
+        return result
+
+    def close(self) -> None:
+        """Arrête le pool de processus"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,90 +1,350 @@
 """
 Gestionnaire de cache corrigé pour FlowTag Pro
 Gère correctement les données binaires (images)
+Stockage dans une base SQLite unique (mode WAL)
 """
 
+import hashlib
 import json
 import os
+import re
+import sqlite3
+import threading
+import unicodedata
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import base64
 
+from .artwork_store import ArtworkBlob, ArtworkStore
+from .memory_cache import LRUMemoryCache
+
+# Version du schéma SQLite (PRAGMA user_version)
+# 2 : clés hachées (key_hash) ; 3 : table des références de pochettes
+SCHEMA_VERSION = 3
+
+# Références de pochettes dans les réponses sérialisées (voir _make_serializable)
+BLOB_REF_RE = re.compile(r'"_type": "blob", "sha256": "([0-9a-f]{64})"')
+
+UPSERT_SQL = (
+    "INSERT INTO api_cache "
+    "(service, key_hash, cache_key, timestamp, expires_at, size, last_access, response_data) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (service, key_hash) DO UPDATE SET "
+    "cache_key = excluded.cache_key, timestamp = excluded.timestamp, "
+    "expires_at = excluded.expires_at, size = excluded.size, "
+    "last_access = excluded.last_access, response_data = excluded.response_data"
+)
+
+
+def hash_cache_key(cache_key: str) -> str:
+    """
+    Clé de stockage d'une entrée : SHA-256 de la clé normalisée (NFC).
+
+    Les titres accentués peuvent arriver composés ou décomposés (noms de
+    fichiers macOS) : la normalisation les fait pointer vers la même entrée,
+    et le hachage garde une clé de taille fixe sans collision de troncature.
+    """
+    return hashlib.sha256(unicodedata.normalize('NFC', cache_key).encode('utf-8')).hexdigest()
+
+
 class CacheManager:
     """Gère le cache des appels API pour éviter les limites de taux"""
-    
-    def __init__(self):
+
+    def __init__(self, db_path: Optional[Path] = None,
+                 memory_max_entries: int = 1000,
+                 memory_max_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 1000 * 1024 * 1024):
         self.cache_dir = Path.home() / '.flotag_pro' / 'cache'
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.cache_duration = timedelta(days=7)  # Cache valide 7 jours
-        
-    def _get_cache_path(self, cache_key: str, service: str) -> Path:
-        """Retourne le chemin du fichier cache"""
-        safe_key = "".join(c for c in cache_key if c.isalnum() or c in "._- ")[:100]
-        return self.cache_dir / f"{service}_{safe_key}.json"
-        
+
+        self.db_path = db_path or Path.home() / '.flotag_pro' / 'cache.db'
+        self.max_disk_bytes = max_disk_bytes  # Budget disque de la base
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_stop = threading.Event()
+        self._touched: Dict[Tuple[str, str], float] = {}  # Accès servis par la mémoire
+        self._conn = self._connect()
+
+        # Niveau mémoire LRU devant SQLite
+        self.memory = LRUMemoryCache(memory_max_entries, memory_max_bytes)
+
+        # Les données binaires (pochettes) vivent hors de la base, par contenu
+        self.artwork_store = ArtworkStore()
+
+        # Migration unique depuis l'ancien cache JSON (un fichier par clé)
+        self.migrate_from_json()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Ouvre la base SQLite et crée le schéma si nécessaire"""
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        # Doit précéder la création des tables pour être pris en compte
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+        if 'api_cache' in tables and version < 2:
+            # Ancien schéma indexé sur la clé brute : le reconstruire. Les index
+            # suivraient la table renommée (et disparaîtraient avec elle) :
+            # les supprimer pour qu'ils soient recréés sur la nouvelle table
+            conn.execute("DROP INDEX IF EXISTS idx_api_cache_expires")
+            conn.execute("DROP INDEX IF EXISTS idx_api_cache_access")
+            conn.execute("ALTER TABLE api_cache RENAME TO api_cache_old")
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS api_cache (
+                service TEXT NOT NULL,
+                key_hash TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL DEFAULT 0,
+                response_data TEXT NOT NULL,
+                PRIMARY KEY (service, key_hash)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_api_cache_expires ON api_cache (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_api_cache_access ON api_cache (last_access)")
+
+        # Compteurs par service maintenus par triggers : statistiques en O(1)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_stats (
+                service TEXT PRIMARY KEY,
+                entries INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS api_cache_insert AFTER INSERT ON api_cache BEGIN
+                INSERT INTO cache_stats (service, entries, bytes) VALUES (NEW.service, 1, NEW.size)
+                ON CONFLICT (service) DO UPDATE SET entries = entries + 1, bytes = bytes + NEW.size;
+            END;
+            CREATE TRIGGER IF NOT EXISTS api_cache_delete AFTER DELETE ON api_cache BEGIN
+                UPDATE cache_stats SET entries = entries - 1, bytes = bytes - OLD.size
+                WHERE service = OLD.service;
+            END;
+            CREATE TRIGGER IF NOT EXISTS api_cache_update AFTER UPDATE OF size ON api_cache BEGIN
+                UPDATE cache_stats SET bytes = bytes - OLD.size + NEW.size
+                WHERE service = NEW.service;
+            END;
+        """)
+
+        if 'api_cache_old' in tables or 'api_cache' in tables and version < 2:
+            conn.create_function('hash_cache_key', 1, hash_cache_key)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(api_cache_old)")]
+            last_access = 'last_access' if 'last_access' in columns else '0'
+            conn.execute(f"""
+                INSERT OR IGNORE INTO api_cache
+                (service, key_hash, cache_key, timestamp, expires_at, size, last_access, response_data)
+                SELECT service, hash_cache_key(cache_key), cache_key, timestamp, expires_at, size,
+                       {last_access}, response_data
+                FROM api_cache_old
+            """)
+            conn.execute("DROP TABLE api_cache_old")
+
+        # Pochettes référencées par chaque entrée, tenues à jour à l'écriture :
+        # le compactage les lit sans parcourir response_data
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_blob_refs (
+                service TEXT NOT NULL,
+                key_hash TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (service, key_hash, sha256)
+            )
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS api_cache_delete_refs AFTER DELETE ON api_cache BEGIN
+                DELETE FROM cache_blob_refs WHERE service = OLD.service AND key_hash = OLD.key_hash;
+            END
+        """)
+        if version < 3:
+            # Remplissage initial depuis les réponses existantes (une seule fois)
+            rows = conn.execute(
+                "SELECT service, key_hash, response_data FROM api_cache WHERE response_data LIKE ?",
+                ('%"_type": "blob"%',)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_blob_refs (service, key_hash, sha256) VALUES (?, ?, ?)",
+                ((service, key_hash, sha256) for service, key_hash, payload in rows
+                 for sha256 in BLOB_REF_RE.findall(payload))
+            )
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
+        # Base créée sans auto_vacuum : le mode incrémental ne s'applique qu'après un VACUUM complet
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("🔄 Activation du vacuum incrémental du cache (une seule fois)...")
+            conn.execute("VACUUM")
+        return conn
+
     def get_api_cache(self, cache_key: str, service: str) -> Optional[Dict[str, Any]]:
         """Récupère une entrée du cache si elle existe et est valide"""
-        cache_path = self._get_cache_path(cache_key, service)
-        
-        if not cache_path.exists():
-            return None
-            
+        return self.get_many([cache_key], service).get(cache_key)
+
+    def get_many(self, cache_keys: Iterable[str], service: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Récupère plusieurs entrées d'un service en une seule requête.
+
+        Args:
+            cache_keys: Clés à rechercher
+            service: Nom du service
+
+        Returns:
+            Dictionnaire cache_key → entrée (seules les entrées valides sont présentes)
+        """
+        # Plusieurs clés (formes Unicode différentes) peuvent viser la même entrée
+        keys_by_hash: Dict[str, List[str]] = {}
+        for cache_key in dict.fromkeys(cache_keys):
+            keys_by_hash.setdefault(hash_cache_key(cache_key), []).append(cache_key)
+
+        found = {}
+        now = datetime.now().timestamp()
+
         try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-                
-            # Vérifier la validité temporelle
-            cached_time = datetime.fromisoformat(cache_data['timestamp'])
-            if datetime.now() - cached_time > self.cache_duration:
-                cache_path.unlink()  # Supprimer le cache expiré
-                return None
-                
-            # Décoder les données binaires si nécessaire
-            response_data = cache_data['response_data']
-            if isinstance(response_data, dict):
-                for key, value in response_data.items():
-                    if isinstance(value, dict) and value.get('_type') == 'bytes':
-                        # Reconvertir en bytes
-                        response_data[key] = base64.b64decode(value['data'])
-                        
-            return cache_data
-            
+            # 1. Niveau mémoire
+            rows = []
+            missing = []
+            for key_hash in keys_by_hash:
+                entry = self.memory.get(service, key_hash, now)
+                if entry is None:
+                    missing.append(key_hash)
+                else:
+                    rows.append((key_hash, *entry))
+                    self._touched[(service, key_hash)] = now
+
+            # 2. Niveau SQLite pour les clés absentes de la mémoire
+            disk_rows = []
+            with self._lock:
+                # SQLite limite le nombre de paramètres par requête
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i:i+500]
+                    placeholders = ','.join('?' * len(chunk))
+                    disk_rows.extend(self._conn.execute(
+                        f"SELECT key_hash, timestamp, expires_at, response_data FROM api_cache "
+                        f"WHERE service = ? AND key_hash IN ({placeholders})",
+                        [service, *chunk]
+                    ).fetchall())
+
+                # Supprimer les entrées expirées rencontrées
+                expired = [(service, row[0]) for row in disk_rows if row[2] < now]
+                if expired:
+                    self._conn.executemany(
+                        "DELETE FROM api_cache WHERE service = ? AND key_hash = ?", expired
+                    )
+                    self._conn.commit()
+
+                # Mettre à jour la date d'accès (éviction LRU)
+                accessed = [(now, service, row[0]) for row in disk_rows if row[2] >= now]
+                if accessed:
+                    self._conn.executemany(
+                        "UPDATE api_cache SET last_access = ? WHERE service = ? AND key_hash = ?",
+                        accessed
+                    )
+                    self._conn.commit()
+
+            for row in disk_rows:
+                if row[2] >= now:
+                    self.memory.put(service, *row)
+                    rows.append(row)
+
+            for key_hash, timestamp, expires_at, payload in rows:
+                for cache_key in keys_by_hash[key_hash]:
+                    found[cache_key] = {
+                        'timestamp': timestamp,
+                        'service': service,
+                        'cache_key': cache_key,
+                        'response_data': self._decode(json.loads(payload))
+                    }
+
         except Exception as e:
-            print(f"Erreur lecture cache pour {cache_key}: {e}")
-            return None
-            
-    def save_api_cache(self, cache_key: str, service: str, response_data: Any) -> None:
-        """Sauvegarde une réponse API dans le cache"""
-        cache_path = self._get_cache_path(cache_key, service)
-        
-        try:
-            # Préparer les données pour la sérialisation JSON
-            serializable_data = self._make_serializable(response_data)
-            
-            cache_data = {
-                'timestamp': datetime.now().isoformat(),
-                'service': service,
-                'cache_key': cache_key,
-                'response_data': serializable_data
-            }
-            
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-                
+            print(f"Erreur lecture cache pour {service}: {e}")
+
+        return found
+
+    def _decode(self, obj: Any) -> Any:
+        """Décode les données binaires si nécessaire"""
+        if isinstance(obj, dict):
+            if obj.get('_type') == 'blob':
+                # Référence paresseuse : l'image n'est lue qu'à l'usage
+                return self.artwork_store.ref(obj['sha256'], obj.get('size', 0))
+            if obj.get('_type') == 'bytes':
+                # Ancien format : base64 en ligne
+                return base64.b64decode(obj['data'])
+            return {k: self._decode(v) for k, v in obj.items()}
+        elif isinstance(obj, list):
+            return [self._decode(item) for item in obj]
+        return obj
+
+    def save_api_cache(self, cache_key: str, service: str, response_data: Any,
+                       duration: Optional[timedelta] = None) -> None:
+        """Sauvegarde une réponse API dans le cache (validité : self.cache_duration par défaut)"""
+        if self.save_many({cache_key: response_data}, service, duration):
             print(f"✅ Cache sauvegardé pour {service}: {cache_key[:50]}...")
-            
+
+    def save_many(self, entries: Dict[str, Any], service: str,
+                  duration: Optional[timedelta] = None) -> int:
+        """
+        Sauvegarde plusieurs réponses d'un service dans une seule transaction.
+
+        Args:
+            entries: Dictionnaire cache_key → données
+            service: Nom du service
+            duration: Durée de validité (défaut : self.cache_duration)
+
+        Returns:
+            Nombre d'entrées sauvegardées
+        """
+        now = datetime.now()
+        expires_at = (now + (duration or self.cache_duration)).timestamp()
+
+        try:
+            rows = []
+            for cache_key, response_data in entries.items():
+                # Préparer les données pour la sérialisation JSON
+                payload = json.dumps(self._make_serializable(response_data), ensure_ascii=False)
+                rows.append((service, hash_cache_key(cache_key), cache_key, now.isoformat(),
+                             expires_at, len(payload), now.timestamp(), payload))
+
+            self._upsert(rows)
+
+            for row in rows:
+                self.memory.put(service, row[1], row[3], row[4], row[7])
+            return len(rows)
+
         except Exception as e:
-            print(f"⚠️ Impossible de sauvegarder le cache pour {cache_key}: {e}")
+            print(f"⚠️ Impossible de sauvegarder le cache pour {service}: {e}")
             # Ne pas faire crasher l'app si le cache échoue
-            
+            return 0
+
+    def _upsert(self, rows: List[Tuple]) -> None:
+        """Écrit des entrées (lignes UPSERT_SQL) et remplace leurs références de pochettes"""
+        keys = [(row[0], row[1]) for row in rows]
+        refs = [(service, key_hash, sha256) for service, key_hash, *_, payload in rows
+                for sha256 in set(BLOB_REF_RE.findall(payload))]
+        with self._lock:
+            self._conn.executemany(UPSERT_SQL, rows)
+            self._conn.executemany(
+                "DELETE FROM cache_blob_refs WHERE service = ? AND key_hash = ?", keys
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cache_blob_refs (service, key_hash, sha256) VALUES (?, ?, ?)", refs
+            )
+            self._conn.commit()
+
     def _make_serializable(self, obj: Any) -> Any:
         """Convertit les objets non-sérialisables en format JSON"""
-        if isinstance(obj, bytes):
-            # Encoder les bytes en base64
+        if isinstance(obj, (bytes, ArtworkBlob)):
+            # Stocker les bytes dans le store par contenu, ne garder que la référence
+            blob = obj if isinstance(obj, ArtworkBlob) else self.artwork_store.put(obj)
             return {
-                '_type': 'bytes',
-                'data': base64.b64encode(obj).decode('utf-8')
+                '_type': 'blob',
+                'sha256': blob.sha256,
+                'size': blob.size
             }
         elif isinstance(obj, dict):
             return {k: self._make_serializable(v) for k, v in obj.items()}
@@ -92,35 +352,269 @@ class CacheManager:
             return [self._make_serializable(item) for item in obj]
         else:
             return obj
-            
-    def clear_cache(self, service: Optional[str] = None) -> None:
-        """Efface le cache (optionnellement pour un service spécifique)"""
-        if service:
-            pattern = f"{service}_*.json"
-        else:
-            pattern = "*.json"
-            
-        for cache_file in self.cache_dir.glob(pattern):
+
+    def migrate_from_json(self) -> int:
+        """
+        Importe l'ancien cache JSON (un fichier par clé) dans SQLite.
+
+        Les fichiers importés sont supprimés : la migration ne s'exécute
+        qu'une fois. Les entrées déjà expirées sont ignorées.
+
+        Returns:
+            Nombre d'entrées importées
+        """
+        json_files = list(self.cache_dir.glob("*.json"))
+        if not json_files:
+            return 0
+
+        print(f"🔄 Migration de {len(json_files)} fichiers du cache JSON vers SQLite...")
+        rows = []
+        now = datetime.now()
+
+        for cache_file in json_files:
             try:
-                cache_file.unlink()
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+
+                cached_time = datetime.fromisoformat(cache_data['timestamp'])
+                expires_at = cached_time + self.cache_duration
+                if expires_at > now:
+                    # Les pochettes base64 en ligne partent dans le store par contenu
+                    response_data = self._make_serializable(self._decode(cache_data['response_data']))
+                    payload = json.dumps(response_data, ensure_ascii=False)
+                    rows.append((
+                        cache_data['service'], hash_cache_key(cache_data['cache_key']),
+                        cache_data['cache_key'], cache_data['timestamp'],
+                        expires_at.timestamp(), len(payload), cached_time.timestamp(), payload
+                    ))
             except Exception as e:
+                print(f"⚠️ Fichier cache ignoré {cache_file.name}: {e}")
+
+        self._upsert(rows)
+
+        for cache_file in json_files:
+            try:
+                cache_file.unlink()
+            except OSError as e:
                 print(f"Erreur suppression cache {cache_file}: {e}")
-                
+
+        print(f"✅ Migration terminée : {len(rows)} entrées importées")
+        return len(rows)
+
+    def clear_cache(self, service: Optional[str] = None) -> None:
+        """Efface le cache (optionnellement pour un service spécifique)"""
+        self.memory.clear(service)
+        try:
+            with self._lock:
+                if service:
+                    self._conn.execute("DELETE FROM api_cache WHERE service = ?", (service,))
+                else:
+                    self._conn.execute("DELETE FROM api_cache")
+                self._conn.commit()
+        except Exception as e:
+            print(f"Erreur suppression cache : {e}")
+
         print(f"✅ Cache effacé{f' pour {service}' if service else ''}")
-        
+
+    def compact(self, max_disk_bytes: Optional[int] = None,
+                artwork_grace: float = 3600.0) -> Dict[str, Any]:
+        """
+        Supprime en masse les entrées expirées puis, si le budget disque est
+        dépassé, les entrées les moins récemment utilisées.
+
+        Le budget compte la base et les pochettes du store. Les pochettes
+        qui ne sont plus référencées par aucune entrée sont supprimées
+        (mark-and-sweep), sauf celles écrites ou réutilisées depuis moins de
+        `artwork_grace` secondes : une analyse en cours peut avoir enregistré
+        une pochette sans avoir encore sauvegardé l'entrée qui la référence.
+
+        Les suppressions sont faites par petits lots pour ne jamais bloquer
+        longtemps les lectures/écritures de l'analyse en cours.
+
+        Args:
+            max_disk_bytes: Budget à respecter (défaut : self.max_disk_bytes)
+            artwork_grace: Âge minimum (s) d'une pochette pour être supprimée
+
+        Returns:
+            Entrées expirées/évincées et octets récupérés par service,
+            pochettes supprimées et octets récupérés sur le store
+        """
+        budget = self.max_disk_bytes if max_disk_bytes is None else max_disk_bytes
+        report: Dict[str, Dict[str, int]] = {}
+        artwork = {'blobs_deleted': 0, 'bytes_reclaimed': 0, 'bytes': 0}
+        now = datetime.now().timestamp()
+
+        def account(rows: List[Tuple[str, str, int]], reason: str) -> None:
+            for service, key_hash, size in rows:
+                entry = report.setdefault(service, {'expired': 0, 'evicted': 0, 'bytes_reclaimed': 0})
+                entry[reason] += 1
+                entry['bytes_reclaimed'] += size
+                self.memory.discard(service, key_hash)
+
+        def delete_blobs(sha256s: Iterable[str]) -> None:
+            for sha256 in sha256s:
+                freed = self.artwork_store.delete(sha256)
+                if freed:
+                    artwork['blobs_deleted'] += 1
+                    artwork['bytes_reclaimed'] += freed
+
+        # Reporter sur le disque les accès servis par le niveau mémoire
+        touched, self._touched = self._touched, {}
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE api_cache SET last_access = ? WHERE service = ? AND key_hash = ?",
+                [(ts, service, key_hash) for (service, key_hash), ts in touched.items()]
+            )
+            self._conn.commit()
+
+        # 1. Entrées expirées
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT service, key_hash, size FROM api_cache WHERE expires_at < ? LIMIT 500",
+                    (now,)
+                ).fetchall()
+                self._delete_rows(rows)
+            account(rows, 'expired')
+            if len(rows) < 500:
+                break
+
+        # 2. Marquage des pochettes référencées par les entrées restantes
+        # (table des références, lue par lots sans garder le verrou)
+        row_blobs: Dict[Tuple[str, str], List[str]] = {}
+        refcount: Dict[str, int] = {}
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, service, key_hash, sha256 FROM cache_blob_refs "
+                    "WHERE rowid > ? ORDER BY rowid LIMIT 1000",
+                    (last_rowid,)
+                ).fetchall()
+            for last_rowid, service, key_hash, sha256 in rows:
+                row_blobs.setdefault((service, key_hash), []).append(sha256)
+                refcount[sha256] = refcount.get(sha256, 0) + 1
+            if len(rows) < 1000:
+                break
+
+        # Balayage : pochettes orphelines (hors délai de grâce)
+        blob_sizes: Dict[str, int] = {}
+        recent = set()
+        orphans = []
+        for sha256, size, mtime in self.artwork_store.iter_blobs():
+            if now - mtime < artwork_grace:
+                recent.add(sha256)
+            elif sha256 not in refcount:
+                orphans.append(sha256)
+                continue
+            blob_sizes[sha256] = size
+        delete_blobs(orphans)
+
+        # 3. Éviction LRU jusqu'à revenir sous le budget (base + pochettes)
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM cache_stats").fetchone()[0]
+        total += sum(blob_sizes.values())
+
+        while total > budget:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT service, key_hash, size FROM api_cache ORDER BY last_access LIMIT 500"
+                ).fetchall()
+                if not rows:
+                    break
+                # Ne supprimer que le nécessaire
+                selected, released = [], []
+                for row in rows:
+                    if total <= budget:
+                        break
+                    selected.append(row)
+                    total -= row[2]
+                    # Une pochette part avec sa dernière entrée
+                    for sha256 in row_blobs.pop((row[0], row[1]), []):
+                        refcount[sha256] -= 1
+                        if refcount[sha256] == 0 and sha256 in blob_sizes and sha256 not in recent:
+                            released.append(sha256)
+                            total -= blob_sizes.pop(sha256)
+                self._delete_rows(selected)
+            account(selected, 'evicted')
+            delete_blobs(released)
+
+        # 4. Rendre l'espace au système de fichiers
+        with self._lock:
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        artwork['bytes'] = sum(blob_sizes.values())
+        reclaimed = sum(entry['bytes_reclaimed'] for entry in report.values()) + artwork['bytes_reclaimed']
+        if report or artwork['blobs_deleted']:
+            print(f"🧹 Compactage du cache : {round(reclaimed / 1024 / 1024, 2)} Mo récupérés "
+                  f"(dont {artwork['blobs_deleted']} pochette(s))")
+
+        return {
+            'services': report,
+            'artwork': artwork,
+            'total_bytes_reclaimed': reclaimed
+        }
+
+    def _delete_rows(self, rows: List[Tuple[str, str, int]]) -> None:
+        """Supprime un lot d'entrées (verrou déjà pris)"""
+        if rows:
+            self._conn.executemany(
+                "DELETE FROM api_cache WHERE service = ? AND key_hash = ?",
+                [(service, key_hash) for service, key_hash, _ in rows]
+            )
+            self._conn.commit()
+
+    def start_sweeper(self, interval: float = 3600.0) -> None:
+        """Lance le compactage périodique dans un thread d'arrière-plan"""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+
+        self._sweeper_stop.clear()
+
+        def sweep():
+            while not self._sweeper_stop.wait(interval):
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"⚠️ Erreur compactage du cache : {e}")
+
+        self._sweeper = threading.Thread(target=sweep, name='cache-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Arrête le compactage périodique"""
+        self._sweeper_stop.set()
+
     def get_cache_stats(self) -> Dict[str, int]:
         """Retourne des statistiques sur le cache"""
         stats = {}
         total_size = 0
-        
-        for service in ['spotify_search', 'spotify_analysis', 'discogs', 'openai', 'full_analysis']:
-            files = list(self.cache_dir.glob(f"{service}_*.json"))
-            stats[service] = len(files)
-            
-            for f in files:
-                total_size += f.stat().st_size
-                
+
+        with self._lock:
+            # Compteurs maintenus incrémentalement, pas de parcours de la table
+            rows = self._conn.execute(
+                "SELECT service, entries, bytes FROM cache_stats WHERE entries > 0"
+            ).fetchall()
+
+        for service, count, size in rows:
+            stats[service] = count
+            total_size += size
+
         stats['total_files'] = sum(stats.values())
         stats['total_size_mb'] = round(total_size / 1024 / 1024, 2)
-        
-        return stats
\ No newline at end of file
+
+        return stats
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Retourne les hits/misses/évictions du niveau mémoire par service"""
+        return self.memory.get_stats()
+
+    def get_cache_size(self) -> float:
+        """Retourne la taille de la base de cache en Mo"""
+        size = 0
+        for suffix in ('', '-wal'):
+            path = Path(f"{self.db_path}{suffix}")
+            if path.exists():
+                size += path.stat().st_size
+        return round(size / 1024 / 1024, 2)
@@ -1,18 +1,27 @@
 """
 Service Discogs corrigé pour FlowTag Pro
+Client asynchrone natif (aiohttp) avec connexions réutilisées
 """
 
 import os
-import time
-import requests
 from typing import Dict, Any, Optional, List
 from .cache_manager import CacheManager
+from .http_session import SharedHTTPSession
+from .quota_ledger import QuotaLedger
+from .retry_policy import RETRY_STATUSES, RetryPolicy
+from .single_flight import SingleFlight
 
 class DiscogsService:
     """Service pour récupérer les infos et pochettes depuis Discogs"""
     
-    def __init__(self, cache_manager: CacheManager):
+    def __init__(self, cache_manager: CacheManager, quota_ledger: Optional[QuotaLedger] = None,
+                 single_flight: Optional[SingleFlight] = None):
         self.cache_manager = cache_manager
+        self.quota_ledger = quota_ledger or QuotaLedger()
+        # Requêtes identiques simultanées (même release, même pochette) partagées
+        self.single_flight = single_flight or SingleFlight()
+        # 429 (Retry-After respecté), 5xx et erreurs réseau relancés
+        self.retry_policy = RetryPolicy(name='Discogs')
         self.token = os.getenv('DISCOGS_TOKEN')
         self.headers = {
             'Authorization': f'Discogs token={self.token}',
@@ -20,6 +29,44 @@ class DiscogsService:
         }
         self.base_url = 'https://api.discogs.com'
         
+        # Session HTTP partagée (keep-alive), recréée si la boucle change
+        self.http = SharedHTTPSession(headers=self.headers)
+        
+    async def _pace(self) -> None:
+        """Espace les requêtes (60 req/min authentifié) sans bloquer la boucle d'événements"""
+        await self.quota_ledger.acquire('discogs')
+            
+    async def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """GET JSON sur l'API Discogs (None si statut non 200), partagé entre appels identiques"""
+        key = (url, tuple(sorted((params or {}).items())))
+        return await self.single_flight.do('discogs_api', key, lambda: self._fetch(url, params))
+        
+    async def _fetch(self, url: str, params: Optional[Dict[str, Any]] = None, binary: bool = False) -> Any:
+        """
+        Requête effective, relancée par `retry_policy` (le quota n'est
+        consommé que par les appels réellement envoyés).
+        
+        Returns:
+            JSON (ou octets si `binary`), None si statut définitif non 200 (404...)
+            
+        Raises:
+            aiohttp.ClientResponseError: 429/5xx persistants après les relances
+        """
+        async def attempt():
+            await self._pace()
+            async with self.http.get().get(url, params=params) as response:
+                if response.status in RETRY_STATUSES:
+                    response.raise_for_status()
+                if response.status != 200:
+                    return None
+                return await (response.read() if binary else response.json())
+                
+        return await self.retry_policy.run(attempt)
+        
+    async def close(self) -> None:
+        """Ferme la session HTTP partagée"""
+        await self.http.close()
+        
     async def get_discogs_info_and_artwork(self, artist: str, title: str) -> Dict[str, Any]:
         """Récupère les infos et la pochette d'un track depuis Discogs"""
         cache_key = f"discogs_full_{artist}_{title}"
@@ -35,6 +82,8 @@ class DiscogsService:
             'label': None,
             'artwork_bytes': None
         }
+        # Limite de taux ou panne : résultat incomplet, à ne pas mettre en cache
+        complete = True
         
         try:
             # Rechercher le release
@@ -67,100 +116,75 @@ class DiscogsService:
                                 result['label'] = detailed_release['labels'][0].get('name', '') if detailed_release['labels'] else ''
                     except Exception as e:
                         print(f"Erreur récupération détails release: {e}")
+                        complete = False
                         # Continuer avec les infos basiques
                 
                 # Récupérer la pochette
                 if release_data.get('cover_image'):
-                    artwork_bytes = await self.download_artwork(release_data['cover_image'])
-                    result['artwork_bytes'] = artwork_bytes
+                    try:
+                        result['artwork_bytes'] = await self.download_artwork(release_data['cover_image'])
+                    except Exception as e:
+                        print(f"Erreur téléchargement pochette: {e}")
+                        complete = False
                     
         except Exception as e:
             print(f"Erreur lors de la récupération des infos Discogs: {e}")
+            complete = False
             
-        # Sauvegarder dans le cache
-        self.cache_manager.save_api_cache(cache_key, 'discogs', result)
+        # Sauvegarder dans le cache (sauf réponse tronquée par une limite de taux ou une panne)
+        if complete:
+            self.cache_manager.save_api_cache(cache_key, 'discogs', result)
         
         return result
         
     async def search_release(self, artist: str, title: str) -> Optional[Dict[str, Any]]:
-        """Recherche un release dans Discogs"""
+        """
+        Recherche un release dans Discogs.
+        
+        Raises:
+            Erreur de l'API ou du réseau persistante après les relances
+            (distincte d'une recherche sans résultat)
+        """
         if not self.token:
             return None
             
-        try:
-            # D'abord essayer avec artiste + titre
-            params = {
-                'artist': artist,
-                'track': title,
-                'type': 'release',
-                'per_page': 10
-            }
-            
-            response = requests.get(
-                f"{self.base_url}/database/search",
-                headers=self.headers,
-                params=params
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('results'):
-                    return data
-                    
-            # Si pas de résultat, essayer avec une recherche plus large
-            params = {
-                'q': f"{artist} {title}",
-                'type': 'release',
-                'per_page': 10
-            }
-            
-            response = requests.get(
-                f"{self.base_url}/database/search",
-                headers=self.headers,
-                params=params
-            )
-            
-            if response.status_code == 200:
-                return response.json()
+        # D'abord essayer avec artiste + titre
+        params = {
+            'artist': artist,
+            'track': title,
+            'type': 'release',
+            'per_page': 10
+        }
+        
+        data = await self._get_json(f"{self.base_url}/database/search", params)
+        if data and data.get('results'):
+            return data
                 
-        except Exception as e:
-            print(f"Erreur recherche Discogs: {e}")
-            
-        return None
+        # Si pas de résultat, essayer avec une recherche plus large
+        params = {
+            'q': f"{artist} {title}",
+            'type': 'release',
+            'per_page': 10
+        }
+        
+        return await self._get_json(f"{self.base_url}/database/search", params)
         
     async def get_release_details(self, release_id: int) -> Optional[Dict[str, Any]]:
-        """Récupère les détails complets d'un release"""
+        """Récupère les détails complets d'un release (erreurs persistantes levées, voir search_release)"""
         if not self.token:
             return None
             
-        try:
-            response = requests.get(
-                f"{self.base_url}/releases/{release_id}",
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-                
-        except Exception as e:
-            print(f"Erreur récupération release {release_id}: {e}")
-            
-        return None
+        return await self._get_json(f"{self.base_url}/releases/{release_id}")
         
     async def download_artwork(self, image_url: str) -> Optional[bytes]:
-        """Télécharge une image de pochette"""
-        try:
-            # Discogs limite les requêtes, on attend un peu
-            time.sleep(0.5)
-            
-            response = requests.get(image_url, headers=self.headers)
-            if response.status_code == 200:
-                return response.content
-                
-        except Exception as e:
-            print(f"Erreur téléchargement pochette: {e}")
-            
-        return None
+        """Télécharge une image de pochette (une seule requête par URL en cours)"""
+        return await self.single_flight.do(
+            'discogs_artwork', image_url, lambda: self._download_artwork(image_url)
+        )
+        
+    async def _download_artwork(self, image_url: str) -> Optional[bytes]:
+        """Téléchargement effectif via la session partagée, avec relances (voir _fetch)"""
+        return await self._fetch(image_url, binary=True)
         
     async def search_artwork(self, artist: str, title: str) -> Optional[bytes]:
         """Recherche et télécharge uniquement la pochette"""
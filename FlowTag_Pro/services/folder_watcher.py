@@ -0,0 +1,204 @@
+"""
+Surveillance de dossiers pour FlowTag Pro
+Analyse automatiquement les nouveaux morceaux déposés dans les dossiers surveillés
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .library_scanner import LibraryScanner
+from .rules_config import get_supported_extensions
+
+# watchdog (inotify sous Linux, FSEvents sous macOS) est optionnel :
+# sans lui, les dossiers sont scannés périodiquement
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object  # type: ignore
+    Observer = None  # type: ignore
+
+
+class _WatchHandler(FileSystemEventHandler):
+    """Relaie les événements du système de fichiers vers la boucle asyncio"""
+
+    def __init__(self, watcher: 'FolderWatcher', loop: asyncio.AbstractEventLoop):
+        self.watcher = watcher
+        self.loop = loop
+
+    def _notify(self, path: str) -> None:
+        self.loop.call_soon_threadsafe(self.watcher.touch, path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._notify(event.dest_path)
+
+
+class FolderWatcher:
+    """
+    Surveille des dossiers et envoie les fichiers audio nouveaux ou modifiés
+    à l'orchestrateur, par lots.
+
+    - Un fichier n'est pris qu'une fois stable (taille et mtime inchangées
+      pendant `settle_seconds`) : les copies en cours sont ignorées.
+    - Les fichiers prêts sont regroupés : un lot part quand plus rien
+      n'arrive pendant `batch_window` secondes ou quand `max_batch` est
+      atteint (une extraction de 300 fichiers donne quelques lots, pas 300).
+    - Les fichiers dont FlowTag vient d'écrire les tags (`mark_written`)
+      ne sont pas ré-analysés tant qu'ils n'ont pas changé depuis.
+    """
+
+    def __init__(self, orchestrator, folders: Iterable[str],
+                 settle_seconds: float = 5.0, batch_window: float = 2.0,
+                 max_batch: int = 200, poll_interval: float = 10.0,
+                 on_result: Optional[Callable[[str, Any], Any]] = None):
+        self.orchestrator = orchestrator
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.settle_seconds = settle_seconds
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.extensions = get_supported_extensions()
+
+        # Fichiers en attente de stabilité : chemin → ((taille, mtime), dernier changement)
+        self._pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        # Fichiers tagués par FlowTag : chemin → (taille, mtime) après écriture
+        self._written: Dict[str, Tuple[int, int]] = {}
+        self._ready: List[str] = []
+        self._last_ready = 0.0
+        self._batches: Optional[asyncio.Queue] = None
+        self._stop = asyncio.Event()
+
+    def touch(self, path: str) -> None:
+        """Signale qu'un fichier a été créé ou modifié"""
+        if os.path.splitext(path)[1].lower() not in self.extensions:
+            return
+        # Le prochain contrôle de stabilité relira taille et mtime
+        self._pending[path] = ((-1, -1), time.monotonic())
+
+    def mark_written(self, path: str) -> None:
+        """Signale que FlowTag vient d'écrire ce fichier (événement à ignorer)"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._written[path] = (stat.st_size, stat.st_mtime_ns)
+
+    async def run(self) -> None:
+        """Surveille les dossiers jusqu'à l'appel de stop()"""
+        loop = asyncio.get_running_loop()
+        self._batches = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(self._settle_loop()),
+            asyncio.create_task(self._analyze_loop())
+        ]
+
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            handler = _WatchHandler(self, loop)
+            for folder in self.folders:
+                observer.schedule(handler, folder, recursive=True)
+            observer.start()
+            print(f"👀 Surveillance de {len(self.folders)} dossier(s) (événements système)")
+        else:
+            tasks.append(asyncio.create_task(self._poll_loop()))
+            print(f"👀 Surveillance de {len(self.folders)} dossier(s) (scan toutes les {self.poll_interval:.0f}s)")
+
+        try:
+            await self._stop.wait()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        """Arrête la surveillance"""
+        self._stop.set()
+
+    async def _poll_loop(self) -> None:
+        """Mode sans watchdog : compare périodiquement l'état des dossiers"""
+        scanner = LibraryScanner(extensions=self.extensions)
+        snapshot = await asyncio.to_thread(self._snapshot, scanner)
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(self._snapshot, scanner)
+            for path, signature in current.items():
+                if snapshot.get(path) != signature:
+                    self.touch(path)
+            snapshot = current
+
+    def _snapshot(self, scanner: LibraryScanner) -> Dict[str, Tuple[int, int]]:
+        """État (taille, mtime) de tous les fichiers audio surveillés"""
+        snapshot = {}
+        for path in scanner.scan(self.folders):
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+        return snapshot
+
+    async def _settle_loop(self) -> None:
+        """Promeut les fichiers stables en lots prêts à analyser"""
+        while True:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+
+            for path, (signature, changed_at) in list(self._pending.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Fichier supprimé ou renommé entre-temps
+                    del self._pending[path]
+                    continue
+
+                current = (stat.st_size, stat.st_mtime_ns)
+                if current != signature:
+                    self._pending[path] = (current, now)
+                elif now - changed_at >= self.settle_seconds:
+                    del self._pending[path]
+                    # Modification due à notre propre écriture de tags
+                    if self._written.pop(path, None) == current:
+                        continue
+                    if path not in self._ready:
+                        self._ready.append(path)
+                        self._last_ready = now
+
+            # Regrouper les rafales en lots
+            if self._ready and (len(self._ready) >= self.max_batch
+                                or now - self._last_ready >= self.batch_window):
+                batch, self._ready = self._ready[:self.max_batch], self._ready[self.max_batch:]
+                await self._batches.put(batch)
+
+    async def _analyze_loop(self) -> None:
+        """Analyse les lots les uns après les autres"""
+        while True:
+            batch = await self._batches.get()
+            print(f"📥 {len(batch)} nouveau(x) fichier(s) à analyser")
+
+            try:
+                async for file_path, result in self.orchestrator.analyze_many(batch):
+                    if self.on_result:
+                        # Le callback peut être synchrone ou une coroutine
+                        outcome = self.on_result(file_path, result)
+                        if asyncio.iscoroutine(outcome):
+                            await outcome
+            except Exception as e:
+                # Un lot en échec n'arrête pas la surveillance
+                print(f"❌ Lot de {len(batch)} fichier(s) interrompu: {e}")
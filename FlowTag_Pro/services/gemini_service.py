@@ -8,26 +8,101 @@ import os
 import json
 import asyncio
 import aiohttp
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple
 from discogs_client import Client
 import google.generativeai as genai
 from .cache_manager import CacheManager
+from .discogs_service import DiscogsService
+from .quota_ledger import QuotaExhaustedError, QuotaLedger
+from .rules_engine import get_classifier
+from .single_flight import SingleFlight
 from ..data.countries_db import detect_country
 from ..data.genres_db import get_genre_contexts, FLOWTAG_AUTO_RULES
 
+# Structure JSON attendue pour chaque morceau (prompt simple et prompt par lot)
+GEMINI_RESPONSE_SCHEMA = """{
+    "genre": "Genre musical précis (Reggaeton, House, Pop, etc)",
+    "bpm": null,
+    "key": "Tonalité Camelot (ex: 11B, 6A) ou null",
+    "energy": 7,
+    "context_moment_pairs": [
+        ["Bar", "Warmup"],
+        ["Club", "Peaktime"],
+        ["Mariage", "Closing"]
+    ],
+    "additional_styles": ["Banger", "Commercial", "Latino"],
+    "mood": "festif énergique",
+    "year_of_release": 2010,
+    "sample_info": null,
+    "dj_tips": "Parfait pour faire monter l'énergie en club"
+}"""
+
+GEMINI_RULES = """**Règles**:
+- Le genre doit être précis (pas "Latin" mais "Reggaeton", "Salsa", etc)
+- context_moment_pairs: minimum 2, maximum 6 paires
+- Contextes possibles: Bar, Club, Mariage, CorporateEvent, Restaurant, Generaliste, CocktailChic, PoolParty
+- Moments possibles: Warmup, Peaktime, Closing
+- Styles possibles: Banger, Bootleg, Classics, Funky, Ladies, Mashup, Commercial, Latino, HipHop, House, Deep, Tech, Vocal, Disco, Progressive
+- energy: nombre entier de 1 à 10
+- Ne PAS mettre de hashtags # dans le JSON"""
+
+GEMINI_SAFETY_SETTINGS = {
+    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+}
+
 
 class GeminiDiscogsService:
     """Service combiné Gemini + Discogs pour analyse intelligente DJ"""
     
-    def __init__(self, cache_manager: CacheManager):
+    def __init__(self, cache_manager: CacheManager, max_concurrent_requests: int = 4,
+                 batch_size: int = 10, batch_window: float = 0.5,
+                 quota_ledger: Optional[QuotaLedger] = None,
+                 single_flight: Optional[SingleFlight] = None):
         self.cache_manager = cache_manager
         self.gemini_model = None
         self.discogs_client = None
+        # Quotas persistants (RPM/RPD), partagés avec les autres services et processus
+        self.quota_ledger = quota_ledger or QuotaLedger()
+        # Recherches Discogs identiques en cours partagées entre morceaux
+        self.single_flight = single_flight or SingleFlight()
+        self.discogs_service = DiscogsService(  # Client HTTP asynchrone
+            cache_manager, self.quota_ledger, self.single_flight
+        )
         self.setup_clients()
         
-        # Statistiques d'utilisation
-        self.daily_requests = 0
-        self.daily_limit = 1500  # Limite gratuite Gemini
+        # Appels Gemini simultanés (sémaphore recréé pour chaque boucle d'événements)
+        self.max_concurrent_requests = max_concurrent_requests
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        
+        # Regroupement des analyses : jusqu'à `batch_size` morceaux par requête,
+        # un lot part quand il est plein ou `batch_window` secondes après son ouverture
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._batch_pending: List[Tuple[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]], asyncio.Future]] = []
+        self._batch_timer: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        
+    @property
+    def daily_requests(self) -> int:
+        """Requêtes Gemini du jour (tous processus confondus)"""
+        return self.quota_ledger.get_usage('gemini')['day']
+        
+    @property
+    def daily_limit(self) -> int:
+        """Limite quotidienne Gemini (1,500 en gratuit)"""
+        return self.quota_ledger.limits['gemini']['rpd']
+        
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Sémaphore limitant les appels Gemini simultanés sur la boucle courante"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+            self._semaphore_loop = loop
+        return self._semaphore
         
     def setup_clients(self):
         """Configuration des clients API"""
@@ -62,24 +137,22 @@ class GeminiDiscogsService:
                              discogs_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyse DJ événementiel complète avec Gemini AI."""
         # Vérifier le cache d'abord
-        cache_key = f"gemini_dj_analysis_v1_{track_info.get('title', '')}_{track_info.get('artist', '')}"
+        cache_key = self._analysis_cache_key(track_info)
         cached_analysis = self.cache_manager.get_api_cache(cache_key, 'gemini_dj_analysis')
         
         if cached_analysis:
             print("  ✅ Analyse trouvée dans le cache")
             return cached_analysis['response_data']
             
-        # Vérifier la limite quotidienne
-        if self.daily_requests >= self.daily_limit:
-            print(f"⚠️ Limite Gemini atteinte ({self.daily_limit}/jour)")
-            return self._fallback_analysis(track_info, spotify_analysis)
+        # Vérifier la limite quotidienne : le morceau sera repris demain
+        self.quota_ledger.ensure_budget('gemini')
             
         # Analyser avec Gemini
         gemini_analysis = {}
-        if self.gemini_model:
+        if self.gemini_model and self.batch_size > 1:
+            gemini_analysis = await self._analyze_in_batch(track_info, spotify_analysis, discogs_data)
+        elif self.gemini_model:
             gemini_analysis = await self._call_gemini_api(track_info, spotify_analysis, discogs_data)
-            self.daily_requests += 1
-            print(f"  📊 Requêtes Gemini aujourd'hui: {self.daily_requests}/{self.daily_limit}")
         else:
             print("  ⚠️ Gemini non disponible, utilisation du fallback")
             gemini_analysis = self._fallback_analysis(track_info, spotify_analysis)
@@ -90,29 +163,170 @@ class GeminiDiscogsService:
         
         return gemini_analysis
         
-    async def _call_gemini_api(self, track_info: Dict[str, Any], 
-                               spotify_analysis: Dict[str, Any], 
-                               discogs_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Construit le prompt et appelle l'API Gemini."""
+    @staticmethod
+    def _analysis_cache_key(track_info: Dict[str, Any]) -> str:
+        return f"gemini_dj_analysis_v1_{track_info.get('title', '')}_{track_info.get('artist', '')}"
+        
+    async def wait_for_quota(self, track_info: Dict[str, Any]) -> None:
+        """
+        Attend un créneau RPM Gemini (sans le consommer) si le morceau devra
+        être envoyé à l'API. Appelé avant le délai de l'étape IA : ce délai
+        ne couvre que la requête, et un lot n'est plus abandonné (quota
+        dépensé pour rien) parce que ses morceaux ont attendu leur tour.
+        
+        Raises:
+            QuotaExhaustedError: budget quotidien épuisé
+        """
+        if not self.gemini_model:
+            return
+        if self.cache_manager.get_api_cache(self._analysis_cache_key(track_info), 'gemini_dj_analysis'):
+            return
+        await self.quota_ledger.wait_available('gemini')
+        
+    async def analyze_tracks_dj_batch(self, tracks: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Analyse DJ d'une liste de morceaux (track_info, spotify_analysis, discogs_data).
+        
+        Les morceaux absents du cache sont regroupés par `batch_size` dans une
+        seule requête Gemini ; les résultats sont retournés dans l'ordre.
+        """
+        return list(await asyncio.gather(*(
+            self.analyze_track_dj(track_info, spotify_analysis, discogs_data)
+            for track_info, spotify_analysis, discogs_data in tracks
+        )))
+        
+    async def _analyze_in_batch(self, track_info: Dict[str, Any],
+                                spotify_analysis: Dict[str, Any],
+                                discogs_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Ajoute le morceau au lot en cours et attend son analyse"""
+        loop = asyncio.get_running_loop()
+        if self._batch_pending and self._batch_pending[0][1].get_loop() is not loop:
+            # Lot resté en attente sur une boucle précédente (l'UI crée une boucle par analyse)
+            self._batch_pending = []
+            self._batch_timer = None
+            
+        future = loop.create_future()
+        self._batch_pending.append(((track_info, spotify_analysis, discogs_data), future))
+        
+        if len(self._batch_pending) >= self.batch_size:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = loop.call_later(self.batch_window, self._flush_batch)
+            
+        return await future
+        
+    def _flush_batch(self):
+        """Envoie le lot en cours (appelé quand il est plein ou à l'expiration de la fenêtre)"""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+            
+        # Les morceaux abandonnés entre-temps (délai dépassé) ne sont pas envoyés
+        entries = [entry for entry in self._batch_pending if not entry[1].done()]
+        self._batch_pending = []
+        if not entries:
+            return
+            
+        task = asyncio.get_running_loop().create_task(self._run_batch(entries))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+        
+    async def _run_batch(self, entries: List[Tuple[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]], asyncio.Future]]):
+        """Analyse un lot en une requête ; seuls les morceaux en échec sont relancés seuls"""
+        results: Dict[int, Any] = {}
         try:
-            # Enrichir le contexte
-            genre = track_info.get('genre', '')
-            subgenre = discogs_data.get('style', [''])[0] if discogs_data.get('style') else ''
+            if len(entries) == 1:
+                results[0] = await self._call_gemini_api(*entries[0][0])
+            else:
+                parsed = await self._call_gemini_batch([item for item, _ in entries])
+                
+                if parsed is None:
+                    # Requête en échec : même repli que pour un appel simple
+                    for index, (item, _) in enumerate(entries):
+                        results[index] = self._fallback_analysis(item[0], item[1])
+                else:
+                    results.update(parsed)
+                    failed = [index for index in range(len(entries)) if index not in parsed]
+                    if failed:
+                        print(f"  🔁 {len(failed)}/{len(entries)} morceau(x) du lot relancé(s) individuellement")
+                        retried = await asyncio.gather(*(
+                            self._call_gemini_api(*entries[index][0]) for index in failed
+                        ), return_exceptions=True)
+                        results.update(zip(failed, retried))
+        except QuotaExhaustedError as e:
+            for index in range(len(entries)):
+                results.setdefault(index, e)
+        finally:
+            for index, (item, future) in enumerate(entries):
+                if future.done():
+                    continue
+                outcome = results.get(index)
+                if isinstance(outcome, QuotaExhaustedError):
+                    future.set_exception(outcome)
+                elif isinstance(outcome, dict) and outcome:
+                    future.set_result(outcome)
+                else:
+                    future.set_result(self._fallback_analysis(item[0], item[1]))
+                    
+    async def _generate(self, prompt: str, max_output_tokens: int) -> Optional[str]:
+        """Appel Gemini asynchrone borné par le sémaphore ; retourne le texte de la réponse"""
+        generation_config = genai.GenerationConfig(
+            temperature=0.7,
+            top_p=0.8,
+            top_k=40,
+            max_output_tokens=max_output_tokens,
+        )
+        
+        # Réserver la requête dans le registre des quotas (attend si RPM atteint)
+        await self.quota_ledger.acquire('gemini')
+        print(f"  📊 Requêtes Gemini aujourd'hui: {self.daily_requests}/{self.daily_limit}")
+        
+        # API asynchrone du SDK : la boucle continue de servir les autres tracks
+        async with self._get_semaphore():
+            response = await self.gemini_model.generate_content_async(
+                prompt,
+                generation_config=generation_config,
+                safety_settings=GEMINI_SAFETY_SETTINGS
+            )
+            
+        return response.text if response and response.text else None
+        
+    def _describe_track(self, track_info: Dict[str, Any],
+                        spotify_analysis: Dict[str, Any],
+                        discogs_data: Dict[str, Any]) -> str:
+        """Bloc de description d'un morceau pour le prompt"""
+        # Enrichir le contexte
+        genre = track_info.get('genre', '')
+        subgenre = discogs_data.get('style', [''])[0] if discogs_data.get('style') else ''
+        # Faits de l'artiste fournis par l'orchestrateur (base d'artistes)
+        artist_facts = track_info.get('artist_facts') or {}
+        if genre or subgenre or not artist_facts:
             suggested_contexts = get_genre_contexts(genre, subgenre)
+        else:
+            suggested_contexts = artist_facts['contexts']
+        if artist_facts:
+            country_info = (artist_facts['country_flag'], artist_facts['country_name'])
+        else:
             country_info = detect_country(track_info.get('artist'))
-            
-            # Récupérer les infos Spotify
-            spotify_track = spotify_analysis.get('spotify_track', {})
-            tempo = spotify_track.get('tempo', 'Inconnu')
-            energy = spotify_track.get('energy', 0)
-            danceability = spotify_track.get('danceability', 0)
-            valence = spotify_track.get('valence', 0)
-            
-            # Prompt optimisé pour Gemini
-            prompt = f"""Tu es un expert DJ événementiel. Analyse ce morceau pour Serato DJ:
-
-**Morceau**: {track_info.get('artist', '')} - {track_info.get('title', '')}
+        artist_genres = ', '.join(artist_facts.get('genres', [])[:5])
+        
+        # Récupérer les infos Spotify
+        spotify_track = spotify_analysis.get('spotify_track', {})
+        tempo = spotify_track.get('tempo', 'Inconnu')
+        energy = spotify_track.get('energy', 0)
+        danceability = spotify_track.get('danceability', 0)
+        valence = spotify_track.get('valence', 0)
+        
+        # Mesures locales (fichier) quand Spotify n'a pas d'audio features
+        local = track_info.get('audio_analysis') or {}
+        local_line = (
+            f"\n**Analyse audio locale**: {local['tempo']} BPM, tonalité {local['key']}, "
+            f"énergie {local['energy']:.2f}/1\n" if local else ''
+        )
+        
+        return f"""**Morceau**: {track_info.get('artist', '')} - {track_info.get('title', '')}
 **Pays artiste**: {country_info[1]} ({country_info[0]})
+**Genres de l'artiste (Spotify)**: {artist_genres or 'Non définis'}
 **Genre principal**: {genre or 'Non défini'}
 **Sous-genre Discogs**: {subgenre or 'Non défini'}
 
@@ -121,65 +335,78 @@ class GeminiDiscogsService:
 - Énergie: {energy:.2f}/1
 - Dansabilité: {danceability:.2f}/1
 - Positivité: {valence:.2f}/1
-
+{local_line}
 **Contextes détectés**: {', '.join(spotify_analysis.get('contexts', ['Non défini']))}
-**Contextes suggérés**: {', '.join(suggested_contexts)}
+**Contextes suggérés**: {', '.join(suggested_contexts)}"""
+        
+    async def _call_gemini_batch(self, tracks: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]) -> Optional[Dict[int, Dict[str, Any]]]:
+        """
+        Analyse plusieurs morceaux en une seule requête Gemini.
+        
+        Returns:
+            Analyses valides indexées par position dans `tracks` (les morceaux
+            absents sont à relancer), ou None si la requête a échoué
+        """
+        try:
+            sections = "\n\n".join(
+                f"### Morceau {index}\n{self._describe_track(*track)}"
+                for index, track in enumerate(tracks, 1)
+            )
+            prompt = f"""Tu es un expert DJ événementiel. Analyse ces {len(tracks)} morceaux pour Serato DJ:
+
+{sections}
+
+**IMPORTANT**: Retourne UNIQUEMENT un tableau JSON valide contenant un objet par morceau.
+Chaque objet contient "track_id" (le numéro du morceau, de 1 à {len(tracks)}) et cette structure EXACTE:
+{GEMINI_RESPONSE_SCHEMA}
+
+{GEMINI_RULES}
+
+Retourne UNIQUEMENT le tableau JSON, rien d'autre."""
+
+            text = await self._generate(prompt, max_output_tokens=min(8192, 512 * len(tracks)))
+            if not text:
+                print("⚠️ Réponse Gemini vide (lot)")
+                return None
+                
+            print(f"  📦 Lot Gemini : {len(tracks)} morceaux en 1 requête")
+            return self._parse_gemini_batch_response(text, len(tracks))
+            
+        except QuotaExhaustedError:
+            raise
+        except Exception as e:
+            print(f"❌ Erreur Gemini API (lot) : {e}")
+            return None
+        
+    async def _call_gemini_api(self, track_info: Dict[str, Any], 
+                               spotify_analysis: Dict[str, Any], 
+                               discogs_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Construit le prompt et appelle l'API Gemini."""
+        try:
+            # Prompt optimisé pour Gemini
+            prompt = f"""Tu es un expert DJ événementiel. Analyse ce morceau pour Serato DJ:
+
+{self._describe_track(track_info, spotify_analysis, discogs_data)}
 
 **IMPORTANT**: Retourne UNIQUEMENT un JSON valide avec cette structure EXACTE:
-{{
-    "genre": "Genre musical précis (Reggaeton, House, Pop, etc)",
-    "bpm": null,
-    "key": "Tonalité Camelot (ex: 11B, 6A) ou null",
-    "energy": 7,
-    "context_moment_pairs": [
-        ["Bar", "Warmup"],
-        ["Club", "Peaktime"],
-        ["Mariage", "Closing"]
-    ],
-    "additional_styles": ["Banger", "Commercial", "Latino"],
-    "mood": "festif énergique",
-    "year_of_release": 2010,
-    "sample_info": null,
-    "dj_tips": "Parfait pour faire monter l'énergie en club"
-}}
+{GEMINI_RESPONSE_SCHEMA}
 
-**Règles**:
-- Le genre doit être précis (pas "Latin" mais "Reggaeton", "Salsa", etc)
-- context_moment_pairs: minimum 2, maximum 6 paires
-- Contextes possibles: Bar, Club, Mariage, CorporateEvent, Restaurant, Generaliste, CocktailChic, PoolParty
-- Moments possibles: Warmup, Peaktime, Closing
-- Styles possibles: Banger, Bootleg, Classics, Funky, Ladies, Mashup, Commercial, Latino, HipHop, House, Deep, Tech, Vocal, Disco, Progressive
-- energy: nombre entier de 1 à 10
-- Ne PAS mettre de hashtags # dans le JSON
+{GEMINI_RULES}
 
 Retourne UNIQUEMENT le JSON, rien d'autre."""
 
             # Appel à Gemini avec gestion de sécurité
-            generation_config = genai.GenerationConfig(
-                temperature=0.7,
-                top_p=0.8,
-                top_k=40,
-                max_output_tokens=1024,
-            )
+            text = await self._generate(prompt, max_output_tokens=1024)
             
-            response = self.gemini_model.generate_content(
-                prompt,
-                generation_config=generation_config,
-                safety_settings={
-                    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
-                    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
-                    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
-                    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-                }
-            )
-            
-            if response and response.text:
+            if text:
                 # Parser la réponse
-                return self._parse_gemini_response(response.text, spotify_analysis)
+                return self._parse_gemini_response(text, spotify_analysis)
             else:
                 print("⚠️ Réponse Gemini vide")
                 return self._fallback_analysis(track_info, spotify_analysis)
                 
+        except QuotaExhaustedError:
+            raise
         except Exception as e:
             print(f"❌ Erreur Gemini API : {e}")
             return self._fallback_analysis(track_info, spotify_analysis)
@@ -187,59 +414,94 @@ Retourne UNIQUEMENT le JSON, rien d'autre."""
     def _parse_gemini_response(self, response_text: str, spotify_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Parse la réponse de Gemini et assure la validité du JSON."""
         try:
-            # Nettoyer la réponse
-            cleaned = response_text.strip()
-            
-            # Extraire le JSON s'il est entouré de texte
-            if '{' in cleaned and '}' in cleaned:
-                start = cleaned.find('{')
-                end = cleaned.rfind('}') + 1
-                json_str = cleaned[start:end]
-            else:
-                json_str = cleaned
-            
-            # Parser le JSON
-            result = json.loads(json_str)
-            
-            # Valider et nettoyer le résultat
-            cleaned_result = {
-                'genre': result.get('genre', ''),
-                'bpm': None,  # Toujours null comme demandé
-                'key': result.get('key'),
-                'energy': int(result.get('energy', 5)),
-                'context_moment_pairs': [],
-                'additional_styles': [],
-                'mood': result.get('mood', ''),
-                'year_of_release': result.get('year_of_release'),
-                'sample_info': result.get('sample_info'),
-                'dj_tips': result.get('dj_tips', '')
-            }
-            
-            # Nettoyer les paires contexte-moment
-            for pair in result.get('context_moment_pairs', []):
-                if isinstance(pair, list) and len(pair) == 2:
-                    context = pair[0].replace('#', '').replace('[', '').replace(']', '')
-                    moment = pair[1].replace('#', '').replace('[', '').replace(']', '')
-                    cleaned_result['context_moment_pairs'].append([f"#{context}", f"#{moment}"])
-            
-            # Nettoyer les styles additionnels
-            for style in result.get('additional_styles', []):
-                clean_style = style.replace('#', '').strip()
-                if clean_style:
-                    cleaned_result['additional_styles'].append(f"#{clean_style}")
+            # Extraire le JSON s'il est entouré de texte, puis le valider
+            return self._validate_gemini_result(json.loads(self._extract_json(response_text, '{', '}')))
             
-            return cleaned_result
-            
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
             print(f"⚠️ Erreur parsing JSON Gemini: {e}")
             print(f"Réponse reçue: {response_text[:200]}...")
             return self._fallback_analysis({}, spotify_analysis)
+            
+    def _parse_gemini_batch_response(self, response_text: str, count: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Parse la réponse d'un lot et valide chaque élément séparément.
+        
+        Returns:
+            Analyses valides indexées par position (0 à count - 1) ; les
+            éléments manquants ou invalides sont absents
+        """
+        try:
+            items = json.loads(self._extract_json(response_text, '[', ']'))
+        except ValueError as e:
+            print(f"⚠️ Erreur parsing JSON Gemini (lot): {e}")
+            print(f"Réponse reçue: {response_text[:200]}...")
+            return {}
+            
+        results = {}
+        for item in items if isinstance(items, list) else []:
+            try:
+                index = int(item['track_id']) - 1
+                if 0 <= index < count and index not in results:
+                    results[index] = self._validate_gemini_result(item)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                print(f"⚠️ Élément de lot Gemini invalide: {e}")
+                
+        return results
+        
+    def _extract_json(self, response_text: str, opener: str, closer: str) -> str:
+        """Extrait le JSON (objet ou tableau) d'une réponse éventuellement entourée de texte"""
+        cleaned = response_text.strip()
+        if opener in cleaned and closer in cleaned:
+            return cleaned[cleaned.find(opener):cleaned.rfind(closer) + 1]
+        return cleaned
+        
+    def _validate_gemini_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Valide et nettoie une analyse Gemini (lève une exception si elle est inexploitable)"""
+        cleaned_result = {
+            'genre': result.get('genre', ''),
+            'bpm': None,  # Toujours null comme demandé
+            'key': result.get('key'),
+            'energy': int(result.get('energy', 5)),
+            'context_moment_pairs': [],
+            'additional_styles': [],
+            'mood': result.get('mood', ''),
+            'year_of_release': result.get('year_of_release'),
+            'sample_info': result.get('sample_info'),
+            'dj_tips': result.get('dj_tips', '')
+        }
+        
+        # Nettoyer les paires contexte-moment
+        for pair in result.get('context_moment_pairs', []):
+            if isinstance(pair, list) and len(pair) == 2:
+                context = pair[0].replace('#', '').replace('[', '').replace(']', '')
+                moment = pair[1].replace('#', '').replace('[', '').replace(']', '')
+                cleaned_result['context_moment_pairs'].append([f"#{context}", f"#{moment}"])
+        
+        # Nettoyer les styles additionnels
+        for style in result.get('additional_styles', []):
+            clean_style = style.replace('#', '').strip()
+            if clean_style:
+                cleaned_result['additional_styles'].append(f"#{clean_style}")
+        
+        return cleaned_result
 
     def _fallback_analysis(self, track_info: Dict[str, Any], spotify_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Analyse de secours basée sur les données Spotify et les règles métier."""
-        contexts = spotify_analysis.get('contexts', ['Bar', 'Club'])
+        contexts = spotify_analysis.get('contexts') or []
         styles = spotify_analysis.get('styles', ['Commercial'])
         
+        # Mesures disponibles : Spotify, sinon analyse audio locale
+        spotify_track = spotify_analysis.get('spotify_track') or {}
+        local = track_info.get('audio_analysis') or {}
+        measured = {
+            'bpm': spotify_track.get('tempo') or local.get('tempo') or track_info.get('bpm'),
+            'energy_raw': spotify_track.get('energy') if spotify_track.get('energy') is not None
+            else local.get('energy'),
+            'genre': track_info.get('genre'),
+            'styles': styles,
+            'artist_genres': (track_info.get('artist_facts') or {}).get('genres')
+        }
+        
         # Règles intelligentes pour les paires contexte-moment
         context_moment_rules = {
             'Bar': ['Warmup', 'Closing'],
@@ -259,7 +521,18 @@ Retourne UNIQUEMENT le JSON, rien d'autre."""
                 for moment in context_moment_rules[context][:2]:  # Max 2 moments par contexte
                     context_moment_pairs.append([f"#{context}", f"#{moment}"])
         
-        # Si pas assez de paires, ajouter des défauts
+        # Pas assez de contextes via les playlists : contextes et moments scorés par rules.yaml
+        if len(context_moment_pairs) < 2:
+            ranked = get_classifier().classify(measured)
+            rule_pairs = [
+                [f"#{context['tag']}", f"#{moment['tag']}"]
+                for context in ranked['contexts'][:3] for moment in ranked['moments'][:2]
+            ]
+            if rule_pairs:
+                context_moment_pairs = rule_pairs
+                contexts = contexts or [context['tag'] for context in ranked['contexts']]
+        
+        # Dernier recours (ni playlists ni règles) : paires par défaut
         if len(context_moment_pairs) < 2:
             context_moment_pairs = [
                 ["#Bar", "#Warmup"],
@@ -272,9 +545,11 @@ Retourne UNIQUEMENT le JSON, rien d'autre."""
             if style in ['Banger', 'Classics', 'Funky', 'Ladies', 'Commercial', 'Latino']:
                 additional_styles.append(f"#{style}")
         
-        # Estimation de l'énergie basée sur les contextes
+        # Énergie mesurée si disponible, sinon estimation basée sur les contextes
         energy = 7  # Défaut
-        if 'Club' in contexts or 'Festival' in contexts:
+        if measured['energy_raw'] is not None:
+            energy = max(1, min(10, round(measured['energy_raw'] * 10)))
+        elif 'Club' in contexts or 'Festival' in contexts:
             energy = 8
         elif 'Restaurant' in contexts or 'CocktailChic' in contexts:
             energy = 4
@@ -307,20 +582,34 @@ Retourne UNIQUEMENT le JSON, rien d'autre."""
             if not title or not artist:
                 return {}
                 
-            # Recherche dans Discogs
-            search_query = f"{artist} {title}"
-            results = self.discogs_client.search(search_query, type='release')
+            # Même artiste/titre déjà en cours de recherche : partager la réponse
+            info = await self.single_flight.do(
+                'discogs_info', (artist.lower().strip(), title.lower().strip()),
+                lambda: self._search_discogs_info(artist, title)
+            )
+            return dict(info)
+        except Exception as e:
+            print(f"Erreur Discogs : {e}")
+            return {}
+            
+    async def _search_discogs_info(self, artist: str, title: str) -> Dict[str, Any]:
+        """Recherche effective d'une release Discogs et extraction des champs utiles"""
+        try:
+            # Recherche dans Discogs (asynchrone, ne bloque pas les autres tracks)
+            results = await self.discogs_service.search_release(artist, title)
             
-            if results:
-                release = results[0]
+            if results and results.get('results'):
+                release = results['results'][0]
+                # Les résultats de recherche sont titrés "Artiste - Titre"
+                release_artist, _, release_title = release.get('title', '').partition(' - ')
                 return {
-                    'release_id': release.id,
-                    'title': release.title,
-                    'artist': release.artists[0].name if release.artists else '',
-                    'year': release.year,
-                    'genre': release.genres,
-                    'style': release.styles,
-                    'cover_image': release.images[0]['uri'] if release.images else None
+                    'release_id': release.get('id'),
+                    'title': release_title or release_artist,
+                    'artist': release_artist if release_title else '',
+                    'year': release.get('year'),
+                    'genre': release.get('genre', []),
+                    'style': release.get('style', []),
+                    'cover_image': release.get('cover_image')
                 }
         except Exception as e:
             print(f"Erreur Discogs : {e}")
@@ -334,14 +623,15 @@ Retourne UNIQUEMENT le JSON, rien d'autre."""
             'service': 'Gemini (Google AI)',
             'daily_requests': self.daily_requests,
             'daily_limit': self.daily_limit,
-            'requests_remaining': self.daily_limit - self.daily_requests,
+            'requests_remaining': self.quota_ledger.remaining('gemini'),
+            'requests_this_minute': self.quota_ledger.get_usage('gemini')['minute'],
             'cost': 'GRATUIT',
-            'reset_time': 'Minuit PST'
+            'reset_time': 'Minuit (heure locale)'
         }
     
     def reset_daily_counter(self):
-        """Réinitialise le compteur quotidien (à appeler à minuit)."""
-        self.daily_requests = 0
+        """Réinitialise le compteur du jour (il repart aussi seul à zéro à minuit)."""
+        self.quota_ledger.reset('gemini')
         print("✅ Compteur Gemini réinitialisé : 1,500 requêtes disponibles")
 
 
@@ -0,0 +1,45 @@
+"""
+Session HTTP partagée pour FlowTag Pro
+Une session aiohttp (pool de connexions keep-alive) par boucle d'événements
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+import aiohttp
+
+
+class SharedHTTPSession:
+    """
+    Session aiohttp réutilisée par tous les appels d'un service.
+
+    Les connexions TCP/TLS restent ouvertes entre les requêtes. Une session
+    ne survit pas à sa boucle d'événements (l'UI en crée une par analyse) :
+    elle est recréée automatiquement quand la boucle change.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None,
+                 total_timeout: float = 15.0, connect_timeout: float = 5.0,
+                 max_connections: int = 10):
+        self.headers = headers or {}
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    def get(self) -> aiohttp.ClientSession:
+        """Retourne la session de la boucle courante"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                headers=self.headers, timeout=self.timeout, connector=connector
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        """Ferme la session (à appeler avant la fin de la boucle)"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
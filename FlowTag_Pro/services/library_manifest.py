@@ -0,0 +1,258 @@
+"""
+Manifeste de bibliothèque pour FlowTag Pro
+Identifie chaque fichier par son contenu et détecte les fichiers nouveaux ou modifiés
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .library_scanner import LibraryScanner
+
+# Taille des blocs hachés au début et à la fin du fichier
+PARTIAL_HASH_BLOCK = 64 * 1024
+
+
+def _tagged_span(f, size: int, ext: str) -> Tuple[int, int]:
+    """Données audio d'un MP3/FLAC : hors ID3v2 en tête, blocs FLAC, ID3v1 et APEv2 en fin"""
+    start, end = 0, size
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b'ID3':
+        tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        start = 10 + tag_size + (10 if header[5] & 0x10 else 0)
+
+    if ext == '.flac':
+        f.seek(start)
+        if f.read(4) == b'fLaC':
+            start += 4
+            while True:
+                block = f.read(4)
+                if len(block) < 4:
+                    break
+                start += 4 + int.from_bytes(block[1:], 'big')
+                f.seek(start)
+                if block[0] & 0x80:
+                    break
+        return start, end
+
+    if end - start >= 128:
+        f.seek(end - 128)
+        if f.read(3) == b'TAG':
+            end -= 128
+    if end - start >= 32:
+        f.seek(end - 32)
+        footer = f.read(32)
+        if footer[:8] == b'APETAGEX':
+            tag_size = int.from_bytes(footer[12:16], 'little')
+            has_header = int.from_bytes(footer[20:24], 'little') & 0x80000000
+            end -= tag_size + (32 if has_header else 0)
+    return start, end
+
+
+def _container_span(f, size: int, ext: str) -> Tuple[int, int]:
+    """Données audio d'un M4A (atome mdat), WAV (chunk data) ou AIFF (chunk SSND)"""
+    if ext == '.m4a':
+        offset = 0
+        while offset + 8 <= size:
+            f.seek(offset)
+            header = f.read(16)
+            atom_size, header_len = int.from_bytes(header[:4], 'big'), 8
+            if atom_size == 1:
+                atom_size, header_len = int.from_bytes(header[8:16], 'big'), 16
+            elif atom_size == 0:
+                atom_size = size - offset
+            if atom_size < header_len:
+                break
+            if header[4:8] == b'mdat':
+                return offset + header_len, offset + atom_size
+            offset += atom_size
+        return 0, size
+
+    magic, audio_chunk, byteorder = (
+        (b'FORM', b'SSND', 'big') if ext == '.aiff' else (b'RIFF', b'data', 'little')
+    )
+    if f.read(4) != magic:
+        return 0, size
+    offset = 12
+    while offset + 8 <= size:
+        f.seek(offset)
+        chunk = f.read(8)
+        chunk_size = int.from_bytes(chunk[4:8], byteorder)
+        if chunk[:4] == audio_chunk:
+            return offset + 8, min(size, offset + 8 + chunk_size)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return 0, size
+
+
+def _audio_span(f, size: int, ext: str) -> Tuple[int, int]:
+    """Début et fin des données audio ; fichier entier si le format n'est pas reconnu"""
+    try:
+        f.seek(0)
+        if ext in ('.mp3', '.flac'):
+            start, end = _tagged_span(f, size, ext)
+        elif ext in ('.m4a', '.wav', '.aiff'):
+            start, end = _container_span(f, size, ext)
+        else:
+            return 0, size
+    except (OSError, ValueError):
+        return 0, size
+    return (start, end) if 0 <= start < end <= size else (0, size)
+
+
+def file_identity(file_path: str, stat: Optional[os.stat_result] = None) -> str:
+    """
+    Identité rapide d'un fichier : taille + hash partiel des données audio.
+
+    Seuls le premier et le dernier bloc de 64 Ko de l'audio sont lus, tags
+    exclus (ID3, APE, blocs FLAC, atomes MP4, chunks WAV/AIFF) : écrire les
+    tags ne change pas l'identité, le cache d'analyse reste valable. Un
+    fichier remplacé ou ré-encodé change d'identité.
+    """
+    stat = stat or os.stat(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(file_path, 'rb') as f:
+        start, end = _audio_span(f, stat.st_size, os.path.splitext(file_path)[1].lower())
+        digest.update(f"{end - start}".encode())
+        f.seek(start)
+        digest.update(f.read(min(PARTIAL_HASH_BLOCK, end - start)))
+        if end - start > 2 * PARTIAL_HASH_BLOCK:
+            f.seek(end - PARTIAL_HASH_BLOCK)
+            digest.update(f.read(PARTIAL_HASH_BLOCK))
+
+    return digest.hexdigest()
+
+
+class LibraryManifest:
+    """
+    Manifeste persistant d'une bibliothèque (un dossier racine).
+
+    Pour chaque fichier : taille, mtime, identité et état d'analyse.
+    Un rescan ne fait qu'un `stat` par fichier ; le contenu n'est relu
+    que pour les fichiers nouveaux ou dont la taille/mtime a changé. Un
+    fichier dont seuls les tags ont changé garde son identité et son état
+    d'analyse.
+    """
+
+    def __init__(self, root: str, manifest_dir: Optional[Path] = None, hash_workers: int = 8):
+        self.root = os.path.abspath(root)
+        manifest_dir = manifest_dir or Path.home() / '.flotag_pro' / 'libraries'
+        manifest_dir.mkdir(parents=True, exist_ok=True)
+        root_id = hashlib.sha1(self.root.encode('utf-8')).hexdigest()[:16]
+        self.manifest_path = manifest_dir / f"{root_id}.json"
+        self.hash_workers = hash_workers
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Charge le manifeste depuis le disque"""
+        if not self.manifest_path.exists():
+            return
+
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get('files', {})
+        except Exception as e:
+            print(f"⚠️ Manifeste illisible, rescan complet : {e}")
+            self.files = {}
+
+    def save(self) -> None:
+        """Sauvegarde le manifeste (écriture atomique)"""
+        data = {
+            'root': self.root,
+            'updated_at': datetime.now().isoformat(),
+            'files': self.files
+        }
+
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        tmp_path.replace(self.manifest_path)
+
+    def rescan(self, file_paths: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Compare la bibliothèque au manifeste.
+
+        Args:
+            file_paths: Fichiers à considérer (défaut : parcours de la racine).
+                Avec un sous-ensemble, seuls ses fichiers disparus sont retirés.
+
+        Returns:
+            Listes 'new', 'changed', 'unchanged', 'removed' et 'to_analyze'
+            (nouveaux, modifiés, ou jamais analysés avec succès)
+        """
+        paths = list(file_paths) if file_paths is not None else LibraryScanner().scan([self.root])
+        diff: Dict[str, List[str]] = {'new': [], 'changed': [], 'unchanged': [], 'removed': []}
+        to_hash, missing = [], []
+
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                missing.append(path)
+                continue
+
+            entry = self.files.get(path)
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                diff['unchanged'].append(path)
+            else:
+                diff['changed' if entry else 'new'].append(path)
+                to_hash.append((path, stat))
+
+        # Hachage partiel en parallèle, uniquement pour les fichiers touchés
+        with ThreadPoolExecutor(max_workers=self.hash_workers) as executor:
+            identities = executor.map(lambda item: self._safe_identity(*item), to_hash)
+            for (path, stat), identity in zip(to_hash, identities):
+                if identity is None:
+                    continue
+                previous = self.files.get(path)
+                # Tags réécrits, audio identique : l'analyse reste valable
+                retagged = previous is not None and previous['identity'] == identity
+                if retagged:
+                    diff['changed'].remove(path)
+                    diff['unchanged'].append(path)
+                self.files[path] = {
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'identity': identity,
+                    'analyzed': retagged and previous.get('analyzed', False)
+                }
+
+        if file_paths is None:
+            # Parcours complet : tout fichier connu sous la racine et non vu a disparu
+            seen = set(paths)
+            prefix = self.root.rstrip(os.sep) + os.sep
+            gone = [path for path in self.files if path not in seen and path.startswith(prefix)]
+        else:
+            gone = [path for path in missing if path in self.files]
+        for path in gone:
+            diff['removed'].append(path)
+            del self.files[path]
+
+        diff['to_analyze'] = [
+            path for path in paths
+            if path in self.files and not self.files[path].get('analyzed')
+        ]
+        return diff
+
+    def _safe_identity(self, path: str, stat: os.stat_result) -> Optional[str]:
+        """Calcule l'identité d'un fichier sans interrompre le scan"""
+        try:
+            return file_identity(path, stat)
+        except OSError as e:
+            print(f"⚠️ Fichier illisible {path}: {e}")
+            return None
+
+    def get_identity(self, file_path: str) -> Optional[str]:
+        """Retourne l'identité connue d'un fichier"""
+        entry = self.files.get(file_path)
+        return entry['identity'] if entry else None
+
+    def mark_analyzed(self, file_path: str) -> None:
+        """Marque un fichier comme analysé"""
+        if file_path in self.files:
+            self.files[file_path]['analyzed'] = True
@@ -0,0 +1,91 @@
+"""
+Scanner de bibliothèque pour FlowTag Pro
+Parcours récursif et parallèle des dossiers (os.scandir)
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from .rules_config import get_supported_extensions
+
+
+class LibraryScanner:
+    """
+    Parcourt des dossiers en parallèle et retourne les fichiers audio par lots.
+
+    Chaque dossier est lu par un `os.scandir` dans un pool de threads (les
+    appels système libèrent le GIL) ; les sous-dossiers découverts sont
+    soumis au fur et à mesure. Les doublons sont éliminés via un set.
+    """
+
+    def __init__(self, extensions: Optional[Set[str]] = None, workers: int = 16, batch_size: int = 500):
+        self.extensions = extensions or get_supported_extensions()
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def _scan_dir(self, path: str) -> Tuple[List[str], List[str]]:
+        """Lit un dossier : retourne (fichiers audio, sous-dossiers)"""
+        files, dirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith('.'):
+                                dirs.append(entry.path)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.extensions:
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"⚠️ Dossier illisible {path}: {e}")
+        return files, dirs
+
+    def iter_batches(self, roots: Iterable[str], exclude: Optional[Set[str]] = None) -> Iterator[List[str]]:
+        """
+        Parcourt les racines et produit les fichiers audio par lots.
+
+        Args:
+            roots: Dossiers (ou fichiers) à parcourir
+            exclude: Chemins déjà connus, ignorés (et complétés au fil du scan)
+
+        Yields:
+            Listes d'au plus `batch_size` chemins, sans doublons
+        """
+        seen = exclude if exclude is not None else set()
+        batch: List[str] = []
+
+        def collect(paths):
+            for path in paths:
+                if path not in seen:
+                    seen.add(path)
+                    batch.append(path)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = set()
+            for root in roots:
+                root = os.path.abspath(root)
+                if os.path.isdir(root):
+                    pending.add(executor.submit(self._scan_dir, root))
+                elif os.path.splitext(root)[1].lower() in self.extensions:
+                    collect([root])
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, dirs = future.result()
+                    collect(files)
+                    for subdir in dirs:
+                        pending.add(executor.submit(self._scan_dir, subdir))
+
+                while len(batch) >= self.batch_size:
+                    yield batch[:self.batch_size]
+                    del batch[:self.batch_size]
+
+        if batch:
+            yield batch
+
+    def scan(self, roots: Iterable[str]) -> List[str]:
+        """Retourne tous les fichiers audio sous les racines"""
+        return [path for batch in self.iter_batches(roots) for path in batch]
@@ -0,0 +1,100 @@
+"""
+Cache mémoire LRU pour FlowTag Pro
+Niveau rapide placé devant le cache persistant (SQLite)
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LRUMemoryCache:
+    """
+    Cache LRU borné en nombre d'entrées et en octets.
+
+    Les entrées sont gardées sous forme sérialisée (JSON) : la taille est
+    connue exactement et un appelant ne peut pas modifier une entrée partagée.
+    Les hits, misses et évictions sont comptés par service.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[str, float, str]]' = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _service_stats(self, service: str) -> Dict[str, int]:
+        """Compteurs d'un service (créés à la demande)"""
+        if service not in self._stats:
+            self._stats[service] = {'hits': 0, 'misses': 0, 'evictions': 0}
+        return self._stats[service]
+
+    def get(self, service: str, cache_key: str, now: float) -> Optional[Tuple[str, float, str]]:
+        """Retourne (timestamp, expires_at, payload) si l'entrée est présente et valide"""
+        with self._lock:
+            entry = self._entries.get((service, cache_key))
+
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    self._remove((service, cache_key))
+                self._service_stats(service)['misses'] += 1
+                return None
+
+            self._entries.move_to_end((service, cache_key))
+            self._service_stats(service)['hits'] += 1
+            return entry
+
+    def put(self, service: str, cache_key: str, timestamp: str, expires_at: float, payload: str) -> None:
+        """Ajoute ou remplace une entrée, puis évince les plus anciennes si nécessaire"""
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            key = (service, cache_key)
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (timestamp, expires_at, payload)
+            self.current_bytes += size
+
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                old_key, old_entry = self._entries.popitem(last=False)
+                self.current_bytes -= len(old_entry[2])
+                self._service_stats(old_key[0])['evictions'] += 1
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """Retire une entrée (verrou déjà pris)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= len(entry[2])
+
+    def discard(self, service: str, cache_key: str) -> None:
+        """Retire une entrée si elle est présente"""
+        with self._lock:
+            self._remove((service, cache_key))
+
+    def clear(self, service: Optional[str] = None) -> None:
+        """Vide le cache mémoire (optionnellement pour un service)"""
+        with self._lock:
+            for key in list(self._entries):
+                if service is None or key[0] == service:
+                    self._remove(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne l'occupation et les compteurs par service"""
+        with self._lock:
+            services = {}
+            for service, counters in self._stats.items():
+                lookups = counters['hits'] + counters['misses']
+                services[service] = dict(counters, hit_rate=round(counters['hits'] / lookups, 3) if lookups else 0.0)
+
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'size_mb': round(self.current_bytes / 1024 / 1024, 2),
+                'max_size_mb': round(self.max_bytes / 1024 / 1024, 2),
+                'services': services
+            }
@@ -10,6 +10,7 @@ import aiohttp
 from typing import Dict, Any, Optional, List
 from discogs_client import Client
 from .cache_manager import CacheManager
+from .quota_ledger import QuotaExhaustedError, QuotaLedger
 from ..data.countries_db import detect_country
 from ..data.genres_db import get_genre_contexts, FLOWTAG_AUTO_RULES
 
@@ -17,8 +18,9 @@ from ..data.genres_db import get_genre_contexts, FLOWTAG_AUTO_RULES
 class OpenAIDiscogsService:
     """Service combiné OpenAI + Discogs pour analyse intelligente DJ"""
     
-    def __init__(self, cache_manager: CacheManager):
+    def __init__(self, cache_manager: CacheManager, quota_ledger: Optional[QuotaLedger] = None):
         self.cache_manager = cache_manager
+        self.quota_ledger = quota_ledger or QuotaLedger()
         self.openai_client = None
         self.discogs_client = None
         self.setup_clients()
@@ -114,6 +116,9 @@ class OpenAIDiscogsService:
             if not self.openai_client and not hasattr(self, 'openai_api_key'):
                 print("⚠️ OpenAI non configuré")
                 return {}
+                
+            # Réserver la requête dans le registre des quotas
+            await self.quota_ledger.acquire('openai')
 
             try:
                 # Essayer d'abord avec le client s'il existe
@@ -159,6 +164,8 @@ class OpenAIDiscogsService:
                 print(f"❌ Erreur appel OpenAI : {e}")
                 return self.parse_text_analysis_dj("", spotify_analysis)
                 
+        except QuotaExhaustedError:
+            raise
         except Exception as e:
             print(f"❌ Erreur OpenAI générale : {e}")
             return self.parse_text_analysis_dj("", spotify_analysis)
@@ -0,0 +1,130 @@
+"""
+Index local des appartenances aux playlists Spotify pour FlowTag Pro
+Associe chaque track_id aux playlists DJ qui le contiennent
+"""
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class PlaylistIndex:
+    """
+    Index inversé track_id → playlists, persistant entre les sessions.
+
+    Chaque playlist est stockée avec son `snapshot_id` Spotify : un
+    rafraîchissement ne re-télécharge que les playlists dont le snapshot
+    a changé. La recherche d'un track est une simple lecture en mémoire.
+
+    Les playlists inaccessibles (404, privées, limite de taux) sont notées
+    avec la date de l'échec : elles ne rendent pas l'index périmé et ne
+    sont retentées qu'au prochain rafraîchissement complet (`max_age`).
+    """
+
+    def __init__(self, index_path: Optional[Path] = None, max_age: timedelta = timedelta(hours=24)):
+        self.index_path = index_path or Path.home() / '.flotag_pro' / 'playlist_index.json'
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.playlists: Dict[str, Dict[str, Any]] = {}
+        self.failed: Dict[str, str] = {}
+        self.updated_at: Optional[datetime] = None
+        self._by_track: Dict[str, List[Dict[str, str]]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Charge l'index depuis le disque"""
+        if not self.index_path.exists():
+            return
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.playlists = data.get('playlists', {})
+            self.failed = data.get('failed', {})
+            if data.get('updated_at'):
+                self.updated_at = datetime.fromisoformat(data['updated_at'])
+        except Exception as e:
+            print(f"⚠️ Index playlists illisible, reconstruction nécessaire: {e}")
+            self.playlists = {}
+            self.failed = {}
+            self.updated_at = None
+
+        self._rebuild()
+
+    def save(self) -> None:
+        """Sauvegarde l'index sur le disque (écriture atomique)"""
+        self.updated_at = datetime.now()
+        data = {
+            'updated_at': self.updated_at.isoformat(),
+            'playlists': self.playlists,
+            'failed': self.failed
+        }
+
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        tmp_path.replace(self.index_path)
+
+    def _rebuild(self) -> None:
+        """Reconstruit l'index inversé track_id → playlists"""
+        by_track: Dict[str, List[Dict[str, str]]] = {}
+        for playlist_id, playlist in self.playlists.items():
+            entry = {'id': playlist_id, 'name': playlist.get('name', '')}
+            for track_id in playlist.get('track_ids', []):
+                by_track.setdefault(track_id, []).append(entry)
+        self._by_track = by_track
+
+    def is_stale(self, playlist_ids: List[str]) -> bool:
+        """Indique si l'index doit être rafraîchi"""
+        if self.updated_at is None:
+            return True
+        if datetime.now() - self.updated_at > self.max_age:
+            return True
+        # Une playlist en échec lors du dernier rafraîchissement ne relance pas tout
+        return any(pid not in self.playlists and pid not in self.failed for pid in playlist_ids)
+
+    def get_snapshot(self, playlist_id: str) -> Optional[str]:
+        """Retourne le snapshot_id connu d'une playlist"""
+        return self.playlists.get(playlist_id, {}).get('snapshot_id')
+
+    def update_playlist(self, playlist_id: str, name: str, snapshot_id: Optional[str],
+                        track_ids: List[str]) -> None:
+        """Remplace le contenu indexé d'une playlist"""
+        self.playlists[playlist_id] = {
+            'name': name,
+            'snapshot_id': snapshot_id,
+            'track_ids': track_ids
+        }
+        self.failed.pop(playlist_id, None)
+
+    def mark_failed(self, playlist_id: str) -> None:
+        """Note une playlist inaccessible (retentée au prochain rafraîchissement)"""
+        self.failed[playlist_id] = datetime.now().isoformat()
+
+    def retain(self, playlist_ids: List[str]) -> None:
+        """Retire de l'index les playlists qui ne sont plus suivies"""
+        for playlist_id in list(self.playlists):
+            if playlist_id not in playlist_ids:
+                del self.playlists[playlist_id]
+        for playlist_id in list(self.failed):
+            if playlist_id not in playlist_ids:
+                del self.failed[playlist_id]
+
+    def commit(self) -> None:
+        """Reconstruit l'index inversé et le sauvegarde"""
+        self._rebuild()
+        self.save()
+
+    def lookup(self, track_id: str) -> List[Dict[str, str]]:
+        """Retourne les playlists contenant ce track"""
+        return list(self._by_track.get(track_id, []))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne des statistiques sur l'index"""
+        return {
+            'playlists': len(self.playlists),
+            'tracks': len(self._by_track),
+            'failed': len(self.failed),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,299 @@
+"""
+Registre des quotas d'API pour FlowTag Pro
+Compteurs persistants par minute et par jour, partagés entre processus (SQLite)
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Limites par fournisseur : requêtes/minute et requêtes/jour (None = illimité),
+# 'tz' = fuseau du changement de jour côté fournisseur (défaut : heure locale)
+DEFAULT_LIMITS: Dict[str, Dict[str, Any]] = {
+    'gemini': {'rpm': 15, 'rpd': 1500, 'tz': 'America/Los_Angeles'},  # Gemini 1.5 Flash gratuit
+    'openai': {'rpm': 60, 'rpd': None},
+    'spotify': {'rpm': 180, 'rpd': None},
+    'discogs': {'rpm': 60, 'rpd': None},  # Discogs authentifié
+}
+
+
+class QuotaExhaustedError(Exception):
+    """Budget quotidien d'un fournisseur épuisé"""
+
+    def __init__(self, provider: str, resume_day: str):
+        super().__init__(f"Quota {provider} épuisé, reprise le {resume_day}")
+        self.provider = provider
+        self.resume_day = resume_day
+
+
+class QuotaLedger:
+    """
+    Registre persistant des requêtes API par fournisseur.
+
+    - Un seau à jetons (capacité `burst`, remplissage rpm/60 par seconde)
+      espace les appels ; le nombre de requêtes de la minute en cours reste
+      plafonné à `rpm`.
+    - Le compteur du jour survit aux redémarrages et repart à zéro à minuit
+      dans le fuseau du fournisseur (un compteur par date).
+    - Chaque réservation est une transaction `BEGIN IMMEDIATE` : plusieurs
+      processus (UI, CLI, cron) partagent le même budget sans le dépasser.
+      Elle s'exécute dans un thread : une base verrouillée par un autre
+      processus ne bloque pas la boucle d'événements.
+    - Les lectures (restant, usage, file de reprise) passent par une
+      connexion de lecture par thread, sans le verrou d'écriture : en WAL
+      elles n'attendent pas les transactions en cours.
+    - Les morceaux bloqués par un quota épuisé sont mis en file
+      « reprise demain » (deferred_tracks).
+    """
+
+    def __init__(self, db_path: Optional[Path] = None,
+                 limits: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.db_path = db_path or Path.home() / '.flotag_pro' / 'quota.db'
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.limits = {provider: dict(limit) for provider, limit in DEFAULT_LIMITS.items()}
+        for provider, limit in (limits or {}).items():
+            self.limits.setdefault(provider, {'rpm': None, 'rpd': None}).update(limit)
+
+        self._zones = {provider: self._zone(limit.get('tz')) for provider, limit in self.limits.items()}
+
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._readers = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Ouvre la base (transactions explicites) et crée le schéma"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS quota_bucket (
+                provider TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS quota_usage (
+                provider TEXT NOT NULL,
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (provider, period, bucket)
+            );
+            CREATE TABLE IF NOT EXISTS deferred_tracks (
+                file_path TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                deferred_at TEXT NOT NULL,
+                resume_day TEXT NOT NULL
+            );
+        """)
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Connexion de lecture du thread courant (hors verrou d'écriture)"""
+        conn = getattr(self._readers, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA query_only=1")
+            self._readers.conn = conn
+        return conn
+
+    @staticmethod
+    def _zone(name: Optional[str]) -> Optional[ZoneInfo]:
+        """Fuseau du fournisseur ; heure locale si absent ou base tz indisponible"""
+        if not name:
+            return None
+        try:
+            return ZoneInfo(name)
+        except ZoneInfoNotFoundError:
+            print(f"⚠️ Fuseau {name} introuvable (installer tzdata), quotas en heure locale")
+            return None
+
+    def _today(self, provider: str) -> date:
+        return datetime.now(self._zones.get(provider)).date()
+
+    def _buckets(self, provider: str) -> Dict[str, str]:
+        """Clés de la minute et du jour courants, dans le fuseau du fournisseur"""
+        now = datetime.now(self._zones.get(provider))
+        return {'minute': now.strftime('%Y-%m-%dT%H:%M'), 'day': now.date().isoformat()}
+
+    def _tomorrow(self, provider: str) -> str:
+        return (self._today(provider) + timedelta(days=1)).isoformat()
+
+    def _count(self, provider: str, period: str, bucket: str,
+               conn: Optional[sqlite3.Connection] = None) -> int:
+        row = (conn or self._conn).execute(
+            "SELECT count FROM quota_usage WHERE provider = ? AND period = ? AND bucket = ?",
+            (provider, period, bucket)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _try_acquire(self, provider: str, consume: bool = True) -> float:
+        """
+        Tente de réserver une requête (`consume=False` : vérifie seulement
+        qu'elle serait accordée, sans la comptabiliser).
+
+        Returns:
+            0 si la requête est accordée, sinon le délai (s) avant de réessayer
+
+        Raises:
+            QuotaExhaustedError: budget quotidien épuisé
+        """
+        limit = self.limits.get(provider, {})
+        rpm, rpd = limit.get('rpm'), limit.get('rpd')
+        buckets = self._buckets(provider)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if rpd is not None and self._count(provider, 'day', buckets['day']) >= rpd:
+                    raise QuotaExhaustedError(provider, self._tomorrow(provider))
+
+                if rpm:
+                    # Plafond strict de la minute en cours
+                    if self._count(provider, 'minute', buckets['minute']) >= rpm:
+                        self._conn.execute("ROLLBACK")
+                        return 60 - now % 60
+
+                    # Seau à jetons : lisse les rafales à l'intérieur de la minute
+                    burst = max(1, rpm // 4)
+                    row = self._conn.execute(
+                        "SELECT tokens, updated_at FROM quota_bucket WHERE provider = ?", (provider,)
+                    ).fetchone()
+                    tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rpm / 60)
+                    if tokens < 1:
+                        self._conn.execute("ROLLBACK")
+                        return (1 - tokens) * 60 / rpm
+
+                if not consume:
+                    self._conn.execute("ROLLBACK")
+                    return 0.0
+
+                if rpm:
+                    self._conn.execute(
+                        "INSERT INTO quota_bucket (provider, tokens, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT (provider) DO UPDATE SET tokens = excluded.tokens, "
+                        "updated_at = excluded.updated_at",
+                        (provider, tokens - 1, now)
+                    )
+
+                for period, bucket in buckets.items():
+                    self._conn.execute(
+                        "INSERT INTO quota_usage (provider, period, bucket, count) VALUES (?, ?, ?, 1) "
+                        "ON CONFLICT (provider, period, bucket) DO UPDATE SET count = count + 1",
+                        (provider, period, bucket)
+                    )
+                # Les minutes écoulées ne servent plus
+                self._conn.execute(
+                    "DELETE FROM quota_usage WHERE provider = ? AND period = 'minute' AND bucket < ?",
+                    (provider, buckets['minute'])
+                )
+                self._conn.execute("COMMIT")
+                return 0.0
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+    async def acquire(self, provider: str) -> None:
+        """
+        Attend qu'une requête soit autorisée puis la comptabilise.
+
+        Raises:
+            QuotaExhaustedError: budget quotidien épuisé
+        """
+        while True:
+            wait = await asyncio.to_thread(self._try_acquire, provider)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def wait_available(self, provider: str) -> None:
+        """
+        Attend qu'une requête puisse être accordée, sans la comptabiliser.
+
+        Permet d'attendre le créneau RPM avant de démarrer un délai : le
+        délai ne mesure alors que la requête elle-même.
+
+        Raises:
+            QuotaExhaustedError: budget quotidien épuisé
+        """
+        while True:
+            wait = await asyncio.to_thread(self._try_acquire, provider, False)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def ensure_budget(self, provider: str) -> None:
+        """Lève QuotaExhaustedError si le budget du jour est déjà épuisé"""
+        if self.remaining(provider) == 0:
+            raise QuotaExhaustedError(provider, self._tomorrow(provider))
+
+    def remaining(self, provider: str) -> Optional[int]:
+        """Requêtes restantes aujourd'hui (None = illimité)"""
+        rpd = self.limits.get(provider, {}).get('rpd')
+        if rpd is None:
+            return None
+        return max(0, rpd - self._count(provider, 'day', self._buckets(provider)['day'], self._reader()))
+
+    def get_usage(self, provider: str) -> Dict[str, Any]:
+        """Requêtes de la minute et du jour en cours, avec les limites"""
+        buckets = self._buckets(provider)
+        reader = self._reader()
+        minute = self._count(provider, 'minute', buckets['minute'], reader)
+        day = self._count(provider, 'day', buckets['day'], reader)
+        limit = self.limits.get(provider, {})
+        return {'minute': minute, 'day': day, 'rpm': limit.get('rpm'), 'rpd': limit.get('rpd')}
+
+    def reset(self, provider: str) -> None:
+        """Remet à zéro le compteur du jour d'un fournisseur"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM quota_usage WHERE provider = ? AND bucket = ?",
+                (provider, self._buckets(provider)['day'])
+            )
+
+    def defer(self, file_path: str, provider: str, resume_day: Optional[str] = None) -> None:
+        """Met un morceau en file « reprise demain »"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO deferred_tracks (file_path, provider, deferred_at, resume_day) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (file_path) DO UPDATE SET "
+                "provider = excluded.provider, deferred_at = excluded.deferred_at, "
+                "resume_day = excluded.resume_day",
+                (file_path, provider, datetime.now().isoformat(), resume_day or self._tomorrow(provider))
+            )
+
+    async def defer_async(self, file_path: str, provider: str, resume_day: Optional[str] = None) -> None:
+        """defer() dans un thread : l'attente du verrou d'écriture reste hors boucle"""
+        await asyncio.to_thread(self.defer, file_path, provider, resume_day)
+
+    def get_due(self) -> List[str]:
+        """Morceaux reportés dont la date de reprise (jour du fournisseur) est atteinte"""
+        rows = self._reader().execute(
+            "SELECT file_path, provider, resume_day FROM deferred_tracks ORDER BY deferred_at"
+        ).fetchall()
+        return [file_path for file_path, provider, resume_day in rows
+                if resume_day <= self._today(provider).isoformat()]
+
+    def resolve(self, file_path: str) -> None:
+        """Retire un morceau de la file de reprise"""
+        with self._lock:
+            self._conn.execute("DELETE FROM deferred_tracks WHERE file_path = ?", (file_path,))
+
+    async def resolve_async(self, file_path: str) -> None:
+        """resolve() dans un thread"""
+        await asyncio.to_thread(self.resolve, file_path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Utilisation par fournisseur et taille de la file de reprise"""
+        deferred = self._reader().execute("SELECT COUNT(*) FROM deferred_tracks").fetchone()[0]
+        return {
+            'providers': {provider: self.get_usage(provider) for provider in self.limits},
+            'deferred_tracks': deferred
+        }
@@ -0,0 +1,138 @@
+"""
+Politique de retry pour les appels API de FlowTag Pro
+Backoff exponentiel avec jitter, respect de Retry-After et comptage des échecs
+"""
+
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Statuts HTTP temporaires : limite de taux et erreurs serveur
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CallStats:
+    """Compteurs d'appels : réussis, limités (429), relancés, en échec"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.succeeded = 0
+        self.throttled = 0
+        self.retried = 0
+        self.failed = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            'succeeded': self.succeeded,
+            'throttled': self.throttled,
+            'retried': self.retried,
+            'failed': self.failed
+        }
+
+    def pop(self) -> Dict[str, int]:
+        """Retourne les compteurs depuis le dernier appel et les remet à zéro"""
+        snapshot = self.snapshot()
+        self.reset()
+        return snapshot
+
+
+class RetryPolicy:
+    """
+    Relance les appels en échec temporaire (429, 5xx, réseau).
+
+    - Backoff exponentiel avec jitter complet : base_delay * 2^n, plafonné à max_delay
+    - Un 429 avec Retry-After suspend tous les appels passant par la
+      politique jusqu'à l'échéance (les workers concurrents ne continuent
+      pas à marteler l'API)
+    - Un Retry-After supérieur à max_retry_after n'est pas attendu : l'appel échoue
+    - Les autres erreurs (404, 400...) ne sont pas relancées
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.5,
+                 max_delay: float = 30.0, max_retry_after: float = 120.0,
+                 name: str = 'API'):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.name = name
+        self._blocked_until = 0.0
+
+    @staticmethod
+    def classify(error: Exception) -> Tuple[bool, bool, Optional[float]]:
+        """
+        Analyse une exception.
+
+        Returns:
+            (relançable, limitée par l'API, délai Retry-After en secondes)
+        """
+        status = getattr(error, 'http_status', None)
+        if status is None:
+            status = getattr(getattr(error, 'response', None), 'status_code', None)
+        if status is None:
+            # aiohttp.ClientResponseError (raise_for_status)
+            status = getattr(error, 'status', None)
+
+        if status is None:
+            # Erreurs réseau (requests.ConnectionError/Timeout dérivent d'OSError)
+            return isinstance(error, (OSError, asyncio.TimeoutError)), False, None
+
+        headers = getattr(error, 'headers', None) or getattr(getattr(error, 'response', None), 'headers', None) or {}
+        retry_after = None
+        try:
+            if headers.get('Retry-After') is not None:
+                retry_after = float(headers['Retry-After'])
+        except (TypeError, ValueError):
+            pass
+
+        return status in RETRY_STATUSES, status == 429, retry_after
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Délai avant la tentative suivante"""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(self, call: Callable[[], Awaitable[Any]], stats: Optional[CallStats] = None) -> Any:
+        """
+        Exécute `call` avec relances.
+
+        Raises:
+            La dernière exception si l'appel échoue définitivement
+        """
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_attempts):
+            # Suspension globale après un Retry-After
+            wait = self._blocked_until - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            try:
+                result = await call()
+            except Exception as e:
+                retryable, throttled, retry_after = self.classify(e)
+                if throttled and stats:
+                    stats.throttled += 1
+
+                give_up = (not retryable or attempt == self.max_attempts - 1
+                           or (retry_after or 0) > self.max_retry_after)
+                if give_up:
+                    if stats:
+                        stats.failed += 1
+                    raise
+
+                delay = self.backoff(attempt, retry_after)
+                if retry_after is not None:
+                    self._blocked_until = max(self._blocked_until, loop.time() + delay)
+                if stats:
+                    stats.retried += 1
+                print(f"⏳ {self.name} : {'limite de taux' if throttled else e}, "
+                      f"nouvel essai dans {delay:.1f}s ({attempt + 1}/{self.max_attempts - 1})")
+                await asyncio.sleep(delay)
+            else:
+                if stats:
+                    stats.succeeded += 1
+                return result
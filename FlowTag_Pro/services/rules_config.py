@@ -0,0 +1,51 @@
+"""
+Chargement des règles d'analyse (config/rules.yaml) pour FlowTag Pro
+Le fichier est lu une seule fois par processus
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Set
+
+import yaml
+
+RULES_PATH = Path(__file__).parent.parent / 'config' / 'rules.yaml'
+
+# Formats utilisés si rules.yaml est absent ou illisible
+DEFAULT_SUPPORTED_FORMATS = ['mp3', 'm4a', 'flac', 'wav', 'aiff', 'ogg']
+
+
+@lru_cache(maxsize=1)
+def load_rules() -> Dict[str, Any]:
+    """Charge config/rules.yaml (mis en cache)"""
+    try:
+        with open(RULES_PATH, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    except Exception as e:
+        print(f"⚠️ Impossible de charger {RULES_PATH.name}: {e}")
+        return {}
+
+
+def get_supported_extensions() -> Set[str]:
+    """Extensions audio prises en charge ('.mp3', '.flac', ...) selon rules.yaml"""
+    formats = load_rules().get('audio_analysis', {}).get('supported_formats') or DEFAULT_SUPPORTED_FORMATS
+    return {f".{fmt.lower().lstrip('.')}" for fmt in formats}
+
+
+# Paramètres d'analyse audio utilisés si rules.yaml ne les définit pas
+DEFAULT_ANALYSIS_PARAMS = {
+    'sample_rate': 22050, 'hop_length': 512, 'n_fft': 2048, 'n_mels': 128,
+    'window_seconds': 30, 'memory_budget_mb': 64
+}
+
+
+def get_analysis_params() -> Dict[str, Any]:
+    """Paramètres de l'analyse audio locale (audio_analysis.analysis_params + seuils BPM)"""
+    audio = load_rules().get('audio_analysis', {})
+    params = dict(DEFAULT_ANALYSIS_PARAMS)
+    params.update(audio.get('analysis_params') or {})
+
+    # Plage de tempo DJ : bornes extrêmes des seuils BPM
+    ranges = list((audio.get('bpm_thresholds') or {}).values())
+    params['bpm_range'] = [min(r[0] for r in ranges), max(r[1] for r in ranges)] if ranges else [60, 180]
+    return params
@@ -0,0 +1,218 @@
+"""
+Moteur de règles DJ pour FlowTag Pro
+Score des contextes et moments de config/rules.yaml, calculé par lots avec NumPy
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .rules_config import load_rules
+
+# numpy est optionnel : sans lui, les règles codées en dur s'appliquent
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+# Champs du morceau où chercher les mots-clés des règles
+TEXT_FIELDS = ('genre', 'styles', 'mood', 'discogs_genre', 'discogs_style', 'artist_genres')
+
+# Part du score réservée aux mots-clés (le reste vient des plages BPM/énergie)
+KEYWORD_SHARE = 0.2
+
+# Mots des champs et des mots-clés ; un composé à trait d'union (tech-house) reste un seul mot
+TOKEN_RE = re.compile(r"\w+(?:[-'’]\w+)*")
+
+
+def _tokens(value: Any) -> Tuple[str, ...]:
+    """Mots en minuscules d'une valeur ("Deep House" → ('deep', 'house'))"""
+    return tuple(TOKEN_RE.findall(str(value).lower()))
+
+
+def _as_float(value: Any) -> float:
+    """Nombre ou NaN (tags vides, "128.0", None...)"""
+    try:
+        return float(value) if value not in (None, '') else float('nan')
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class RulesClassifier:
+    """
+    Classe des morceaux selon `dj_classification` (contextes et moments).
+
+    Les règles sont compilées une fois en matrices : bornes BPM et énergie,
+    poids, et matrice mots-clés → règles. Un appel à `classify_many` score
+    toutes les règles pour tous les morceaux en une passe vectorisée
+    (tableaux N morceaux × R règles), ce qui permet de re-scorer une
+    bibliothèque entière après une modification de rules.yaml.
+
+    Score d'une règle : moyenne des appartenances aux plages BPM et énergie
+    (1 dans la plage, décroissance linéaire sur `bpm_tolerance` /
+    `energy_tolerance` au-delà), présence d'un mot-clé pour KEYWORD_SHARE
+    du score, le tout multiplié par le poids de la règle. Un mot-clé
+    correspond à des mots entiers consécutifs d'une même valeur de champ
+    ("bar" ne trouve pas "barbershop", ni "house" "tech-house").
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None, min_score: float = 0.5,
+                 bpm_tolerance: float = 10.0, energy_tolerance: float = 0.15):
+        classification = (rules if rules is not None else load_rules()).get('dj_classification', {})
+        self.min_score = min_score
+        self.bpm_tolerance = bpm_tolerance
+        self.energy_tolerance = energy_tolerance
+        self.sections = {}
+        if self.available:
+            self.sections = {
+                section: self._compile(classification.get(section) or {})
+                for section in ('contexts', 'moments')
+            }
+
+    @property
+    def available(self) -> bool:
+        """numpy est installé"""
+        return np is not None
+
+    @staticmethod
+    def _compile(rules: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Règles d'une section → tableaux alignés (une colonne par règle)"""
+        names = list(rules)
+        # Mots-clés normalisés en suites de mots (expressions comprises)
+        vocabulary = sorted({
+            _tokens(keyword) for rule in rules.values() for keyword in rule.get('keywords') or []
+        } - {()})
+        index = {phrase: row for row, phrase in enumerate(vocabulary)}
+        keyword_matrix = np.zeros((len(vocabulary), len(names)), dtype=bool)
+        for column, name in enumerate(names):
+            for keyword in rules[name].get('keywords') or []:
+                if _tokens(keyword):
+                    keyword_matrix[index[_tokens(keyword)], column] = True
+
+        def bounds(field: str, default: List[float]):
+            return np.array([rules[name].get(field) or default for name in names], dtype=float).reshape(-1, 2)
+
+        return {
+            'names': names,
+            'tags': [rules[name].get('tag', name) for name in names],
+            'bpm': bounds('bpm_range', [0, 1000]),
+            'energy': bounds('energy_range', [0, 1]),
+            'weight': np.array([rules[name].get('weight', 1.0) for name in names], dtype=float),
+            'vocabulary': index,
+            'max_words': max((len(phrase) for phrase in vocabulary), default=0),
+            'keywords': keyword_matrix
+        }
+
+    @staticmethod
+    def _features(tracks: List[Dict[str, Any]]):
+        """BPM (N,), énergie 0-1 (N,) et mots de chaque valeur de champ, par morceau"""
+        bpm = np.array([
+            _as_float(track.get('bpm') or track.get('tempo')) for track in tracks
+        ])
+        # Énergie mesurée (Spotify ou analyse locale, 0-1), sinon estimation 1-10 de l'IA
+        energy = np.array([
+            _as_float(track.get('energy_raw')) if track.get('energy_raw') is not None
+            else _as_float(track.get('energy')) / 10
+            for track in tracks
+        ])
+        # Une suite de mots par valeur : une expression ne chevauche pas deux champs
+        texts = []
+        for track in tracks:
+            values = []
+            for field in TEXT_FIELDS:
+                value = track.get(field)
+                values.extend(value if isinstance(value, list) else [value] if value else [])
+            texts.append([tokens for tokens in map(_tokens, values) if tokens])
+        return bpm, energy, texts
+
+    @staticmethod
+    def _keyword_hits(texts: List[List[Tuple[str, ...]]], compiled: Dict[str, Any]):
+        """Présence (N, V) de chaque mot-clé, comparé aux n-grammes de mots de chaque valeur"""
+        vocabulary, max_words = compiled['vocabulary'], compiled['max_words']
+        hits = np.zeros((len(texts), len(vocabulary)), dtype=bool)
+        for row, values in enumerate(texts):
+            for tokens in values:
+                for size in range(1, min(max_words, len(tokens)) + 1):
+                    for start in range(len(tokens) - size + 1):
+                        column = vocabulary.get(tokens[start:start + size])
+                        if column is not None:
+                            hits[row, column] = True
+        return hits
+
+    @staticmethod
+    def _range_score(values, bounds, tolerance: float):
+        """Appartenance (N, R) aux plages : 1 dedans, 0 à `tolerance` au-delà, NaN si inconnu"""
+        values = values[:, None]
+        distance = np.maximum(bounds[:, 0] - values, 0) + np.maximum(values - bounds[:, 1], 0)
+        return np.clip(1 - distance / tolerance, 0, 1)
+
+    def score_many(self, tracks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Scores bruts de toutes les règles.
+
+        Returns:
+            {'contexts': (N, R) array, 'moments': (N, R) array}
+        """
+        bpm, energy, texts = self._features(tracks)
+        scores = {}
+
+        for section, compiled in self.sections.items():
+            ranges = np.stack([
+                self._range_score(bpm, compiled['bpm'], self.bpm_tolerance),
+                self._range_score(energy, compiled['energy'], self.energy_tolerance)
+            ])
+            known = ~np.isnan(ranges)
+            base = np.where(
+                known.any(axis=0),
+                np.nansum(ranges, axis=0) / np.maximum(known.sum(axis=0), 1),
+                0.0
+            )
+
+            if compiled['vocabulary'] and texts:
+                hits = self._keyword_hits(texts, compiled)
+                matched = (hits.astype(int) @ compiled['keywords'].astype(int)) > 0
+            else:
+                matched = np.zeros_like(base, dtype=bool)
+
+            scores[section] = ((1 - KEYWORD_SHARE) * base + KEYWORD_SHARE * matched) * compiled['weight']
+        return scores
+
+    def classify_many(self, tracks: Iterable[Dict[str, Any]]) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Contextes et moments classés pour chaque morceau.
+
+        Returns:
+            Par morceau : {'contexts': [...], 'moments': [...]}, chaque liste
+            triée par score décroissant avec des éléments
+            {'tag', 'rule', 'score'} (meilleure règle par tag, score >= min_score)
+        """
+        tracks = list(tracks)
+        if not tracks or not self.available:
+            return [{'contexts': [], 'moments': []} for _ in tracks]
+
+        results = [{} for _ in tracks]
+        for section, scores in self.score_many(tracks).items():
+            compiled = self.sections[section]
+            order = np.argsort(-scores, axis=1, kind='stable')
+            for row, result in enumerate(results):
+                ranked, seen = [], set()
+                for column in order[row]:
+                    score = float(scores[row, column])
+                    if score < self.min_score:
+                        break
+                    tag = compiled['tags'][column]
+                    if tag not in seen:
+                        seen.add(tag)
+                        ranked.append({'tag': tag, 'rule': compiled['names'][column], 'score': round(score, 3)})
+                result[section] = ranked
+        return results
+
+    def classify(self, track: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Contextes et moments classés d'un seul morceau"""
+        return self.classify_many([track])[0]
+
+
+@lru_cache(maxsize=1)
+def get_classifier() -> RulesClassifier:
+    """Classifieur partagé (rules.yaml compilé une seule fois par processus)"""
+    return RulesClassifier()
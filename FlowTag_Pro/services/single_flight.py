@@ -0,0 +1,80 @@
+"""
+Regroupement des requêtes identiques en cours pour FlowTag Pro
+Les appels simultanés avec la même clé partagent une seule requête réseau
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Partage une requête en cours entre tous les appelants de même clé.
+
+    Le cache API ne sert qu'une fois la première réponse enregistrée : quand
+    plusieurs morceaux d'un même artiste ou d'une même release sont traités
+    en même temps, les recherches identiques partent toutes. Ici, le premier
+    appelant lance la requête et les suivants attendent son résultat (ou son
+    exception). La clé est libérée dès la fin de la requête : les appels
+    ultérieurs passent par le cache habituel.
+
+    Les tâches ne survivent pas à leur boucle d'événements (l'UI en crée une
+    par analyse) : la table des requêtes en cours est remise à zéro quand la
+    boucle change.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._loop = None
+        # Par espace de noms : requêtes lancées et appels économisés
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _namespace_stats(self, namespace: str) -> Dict[str, int]:
+        if namespace not in self._stats:
+            self._stats[namespace] = {'calls': 0, 'saved': 0}
+        return self._stats[namespace]
+
+    async def do(self, namespace: str, key: Hashable,
+                 call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Exécute `call()` ou rejoint la requête identique déjà en cours.
+
+        Args:
+            namespace: Type de requête ('spotify_search', 'discogs_http'...)
+            key: Identifie la requête dans son espace de noms
+            call: Fabrique la coroutine de la requête
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._inflight = {}
+            self._loop = loop
+
+        stats = self._namespace_stats(namespace)
+        flight_key = (namespace, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            stats['calls'] += 1
+            task = loop.create_task(call())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        else:
+            stats['saved'] += 1
+        # shield : un appelant annulé (délai dépassé) n'annule pas les autres
+        return await asyncio.shield(task)
+
+    def pop_stats(self) -> Dict[str, Dict[str, int]]:
+        """Compteurs par espace de noms depuis le dernier relevé, puis remise à zéro"""
+        stats, self._stats = self._stats, {}
+        return stats
+
+    def print_stats(self, label: str) -> Dict[str, Dict[str, int]]:
+        """Affiche les appels économisés depuis le dernier relevé (s'il y en a)"""
+        stats = self.pop_stats()
+        saved = sum(counts['saved'] for counts in stats.values())
+        if saved:
+            details = ', '.join(
+                f"{namespace} {counts['saved']}" for namespace, counts in sorted(stats.items())
+                if counts['saved']
+            )
+            print(f"  🔗 {label} : {saved} appel(s) identique(s) regroupé(s) ({details})")
+        return stats
@@ -5,20 +5,50 @@ Optimisé pour l'analyse DJ événementiel
 
 import os
 import asyncio
+import functools
+from datetime import timedelta
+import requests
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from typing import Dict, Any, Optional, List, Tuple
 from concurrent.futures import ThreadPoolExecutor
 from .cache_manager import CacheManager
+from .http_session import SharedHTTPSession
+from .playlist_index import PlaylistIndex
+from .quota_ledger import QuotaLedger
+from .retry_policy import CallStats, RetryPolicy
+from .single_flight import SingleFlight
+from .track_matcher import HIGH_CONFIDENCE, MIN_SCORE, score_candidate
+
+# Nombre maximum d'IDs par appel groupé accepté par l'API Spotify
+AUDIO_FEATURES_BATCH = 100
+TRACKS_BATCH = 50
+ARTISTS_BATCH = 50
 
 
 class SpotifyAsyncService:
     """Service Spotify asynchrone avec playlists vérifiées et actualisées"""
     
-    def __init__(self, cache_manager: CacheManager):
+    def __init__(self, cache_manager: CacheManager, quota_ledger: Optional[QuotaLedger] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 not_found_cache_duration: timedelta = timedelta(hours=6)):
         self.cache_manager = cache_manager
+        self.quota_ledger = quota_ledger or QuotaLedger()
+        # Morceau introuvable (aucun candidat assez sûr) : gardé peu de temps en cache
+        self.not_found_cache_duration = not_found_cache_duration
+        # Requêtes identiques simultanées (même morceau, même pochette) partagées
+        self.single_flight = single_flight or SingleFlight()
         self.sp = None
         self.executor = ThreadPoolExecutor(max_workers=5)
+        self.playlist_index = PlaylistIndex()
+        self._index_task: Optional[asyncio.Task] = None
+        # Délai avant de lancer les stratégies de recherche de secours
+        self.search_hedge_delay = 0.25
+        # Téléchargements de pochettes : session partagée (keep-alive)
+        self.http = SharedHTTPSession(total_timeout=20.0)
+        # Relances centralisées (429/5xx/réseau) et comptage des appels
+        self.retry_policy = RetryPolicy(name='Spotify')
+        self.call_stats = CallStats()
         self.setup_client()
         
     def setup_client(self):
@@ -32,7 +62,9 @@ class SpotifyAsyncService:
                     client_id=client_id,
                     client_secret=client_secret
                 )
-                self.sp = spotipy.Spotify(auth_manager=auth_manager)
+                # Session requests sans retries internes : un 429 remonte avec
+                # son Retry-After jusqu'à RetryPolicy au lieu de bloquer un thread
+                self.sp = spotipy.Spotify(auth_manager=auth_manager, requests_session=requests.Session())
                 print("✅ Client Spotify configuré avec succès")
             except Exception as e:
                 print(f"❌ Erreur configuration Spotify: {e}")
@@ -197,8 +229,21 @@ class SpotifyAsyncService:
             "37i9dQZF1DX2UgsUIg75Vg": "Sleep",                   # Sleep music
         }
     
-    async def search_track(self, title: str, artist: str) -> Optional[Dict[str, Any]]:
-        """Recherche améliorée d'un track dans Spotify"""
+    async def search_track(self, title: str, artist: str, with_features: bool = True,
+                           duration_ms: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Recherche améliorée d'un track dans Spotify.
+        
+        Les stratégies de recherche partent en parallèle (les variantes de
+        secours après `search_hedge_delay`) ; les candidats de toutes les
+        requêtes sont notés (titre, artiste, version, durée) et un résultat
+        très sûr annule les requêtes restantes.
+        
+        Args:
+            with_features: Ajouter les features audio (False quand elles sont
+                récupérées plus tard par lots avec get_audio_features_many)
+            duration_ms: Durée du fichier local, pour départager les versions
+        """
         if not self.sp:
             return None
             
@@ -208,8 +253,33 @@ class SpotifyAsyncService:
             cached_result = self.cache_manager.get_api_cache(cache_key, 'spotify_search')
             
             if cached_result:
-                return cached_result['response_data']
+                track_info = cached_result['response_data']
+                if track_info.get('not_found'):
+                    return None
+                if with_features:
+                    await self._add_audio_features(track_info)
+                return track_info
+                
+            # Les recherches identiques en cours (même morceau dans le lot) sont
+            # partagées ; chaque appelant reçoit sa copie (features ajoutées ensuite)
+            track_info = await self.single_flight.do(
+                'spotify_search', (title, artist, duration_ms),
+                lambda: self._search_best(title, artist, duration_ms, cache_key)
+            )
+            if track_info:
+                track_info = dict(track_info)
+                if with_features:
+                    await self._add_audio_features(track_info)
+            return track_info
                 
+        except Exception as e:
+            print(f"❌ Erreur recherche Spotify: {e}")
+            return None
+            
+    async def _search_best(self, title: str, artist: str, duration_ms: Optional[int],
+                           cache_key: str) -> Optional[Dict[str, Any]]:
+        """Recherche effective : stratégies en parallèle et meilleur candidat noté (sans features)"""
+        try:
             # Recherche avec plusieurs stratégies
             search_queries = [
                 f'track:"{title}" artist:"{artist}"',  # Recherche exacte
@@ -217,38 +287,63 @@ class SpotifyAsyncService:
                 f'track:{title} artist:{artist}'        # Sans guillemets
             ]
             
-            track_info = None
-            for query in search_queries:
-                results = await self._run_async(self.sp.search, q=query, type='track', limit=10)
-                
-                if results and results['tracks']['items']:
-                    # Chercher la meilleure correspondance
-                    for track in results['tracks']['items']:
-                        track_artist = track['artists'][0]['name'].lower()
-                        track_title = track['name'].lower()
-                        
-                        # Vérifier la correspondance
-                        if (artist.lower() in track_artist or track_artist in artist.lower()) and \
-                           (title.lower() in track_title or track_title in title.lower()):
-                            track_info = self._extract_track_info(track)
-                            break
-                    
-                    if track_info:
+            tasks = [
+                asyncio.create_task(self._search_candidates(query, self.search_hedge_delay if index else 0))
+                for index, query in enumerate(search_queries)
+            ]
+            
+            best_track, best_score = None, 0.0
+            complete = True
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    candidates = await next_result
+                    if candidates is None:
+                        complete = False
+                        continue
+                    for track in candidates:
+                        score = score_candidate(track, title, artist, duration_ms)
+                        if score > best_score:
+                            best_track, best_score = track, score
+                    if best_score >= HIGH_CONFIDENCE:
                         break
+            finally:
+                # Les stratégies encore en attente n'envoient pas leur requête
+                for task in tasks:
+                    task.cancel()
+                    
+            track_info = None
+            if best_track and best_score >= MIN_SCORE:
+                track_info = self._extract_track_info(best_track)
+                track_info['match_score'] = round(best_score, 3)
             
             if track_info:
-                # Ajouter les features audio
-                await self._add_audio_features(track_info)
-                
-                # Sauvegarder dans le cache
+                # Sauvegarder dans le cache (les features ont leur propre cache par ID)
                 self.cache_manager.save_api_cache(cache_key, 'spotify_search', track_info)
+            elif complete:
+                # Introuvable alors que toutes les stratégies ont répondu : résultat
+                # négatif gardé peu de temps (une stratégie en échec ne prouve rien)
+                self.cache_manager.save_api_cache(
+                    cache_key, 'spotify_search', {'not_found': True}, duration=self.not_found_cache_duration
+                )
                 
-            print(f"  ✅ Trouvé sur Spotify: {track_info['name'] if track_info else 'Non trouvé'}")
+            print(f"  ✅ Trouvé sur Spotify: {track_info['name'] if track_info else 'Non trouvé'}"
+                  f"{f' (score {best_score:.2f})' if track_info else ''}")
             return track_info
                 
         except Exception as e:
             print(f"❌ Erreur recherche Spotify: {e}")
             return None
+            
+    async def _search_candidates(self, query: str, delay: float = 0) -> Optional[List[Dict[str, Any]]]:
+        """Une stratégie de recherche : retourne les tracks candidats (None en cas d'échec)"""
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            results = await self._run_async(self.sp.search, q=query, type='track', limit=10)
+        except Exception as e:
+            print(f"⚠️ Recherche Spotify échouée ({query}): {e}")
+            return None
+        return (results or {}).get('tracks', {}).get('items', [])
     
     def _extract_track_info(self, track: Dict[str, Any]) -> Dict[str, Any]:
         """Extrait les informations importantes d'un track"""
@@ -256,6 +351,7 @@ class SpotifyAsyncService:
             'id': track['id'],
             'name': track['name'],
             'artist': track['artists'][0]['name'] if track['artists'] else '',
+            'artist_id': track['artists'][0].get('id') if track['artists'] else None,
             'artists': [a['name'] for a in track.get('artists', [])],
             'album': track['album']['name'] if track.get('album') else '',
             'popularity': track.get('popularity', 0),
@@ -271,68 +367,129 @@ class SpotifyAsyncService:
         if not track_info.get('id'):
             return
             
-        try:
-            features = await self._run_async(self.sp.audio_features, track_info['id'])
-            
-            if features and features[0]:
-                track_info.update({
-                    'danceability': features[0].get('danceability', 0),
-                    'energy': features[0].get('energy', 0),
-                    'valence': features[0].get('valence', 0),
-                    'tempo': features[0].get('tempo', 120),
-                    'key': features[0].get('key', 0),
-                    'mode': features[0].get('mode', 0),
-                    'acousticness': features[0].get('acousticness', 0),
-                    'instrumentalness': features[0].get('instrumentalness', 0),
-                    'liveness': features[0].get('liveness', 0),
-                    'speechiness': features[0].get('speechiness', 0),
-                    'loudness': features[0].get('loudness', 0),
-                    'time_signature': features[0].get('time_signature', 4)
+        features = await self.get_audio_features_many([track_info['id']])
+        track_info.update(features.get(track_info['id'], {}))
+        
+    @staticmethod
+    def _extract_audio_features(features: Dict[str, Any]) -> Dict[str, Any]:
+        """Champs utiles des features audio Spotify"""
+        return {
+            'danceability': features.get('danceability', 0),
+            'energy': features.get('energy', 0),
+            'valence': features.get('valence', 0),
+            'tempo': features.get('tempo', 120),
+            'key': features.get('key', 0),
+            'mode': features.get('mode', 0),
+            'acousticness': features.get('acousticness', 0),
+            'instrumentalness': features.get('instrumentalness', 0),
+            'liveness': features.get('liveness', 0),
+            'speechiness': features.get('speechiness', 0),
+            'loudness': features.get('loudness', 0),
+            'time_signature': features.get('time_signature', 4)
+        }
+        
+    async def get_audio_features_many(self, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Features audio de plusieurs tracks : cache par ID, puis un appel
+        par lot de 100 IDs pour les manquants.
+        
+        Returns:
+            Dictionnaire track_id → features (tracks sans features absents)
+        """
+        return await self._fetch_by_ids(
+            track_ids, 'spotify_features', AUDIO_FEATURES_BATCH,
+            self.sp.audio_features if self.sp else None,
+            lambda response: [
+                (features['id'], self._extract_audio_features(features))
+                for features in response or [] if features
+            ]
+        )
+        
+    async def get_tracks_many(self, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Informations de plusieurs tracks : cache par ID, puis un appel
+        par lot de 50 IDs pour les manquants.
+        
+        Returns:
+            Dictionnaire track_id → infos du track (_extract_track_info)
+        """
+        return await self._fetch_by_ids(
+            track_ids, 'spotify_tracks', TRACKS_BATCH,
+            self.sp.tracks if self.sp else None,
+            lambda response: [
+                (track['id'], self._extract_track_info(track))
+                for track in (response or {}).get('tracks', []) if track
+            ]
+        )
+        
+    async def get_artists_many(self, artist_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Genres et popularité de plusieurs artistes : cache par ID, puis un
+        appel par lot de 50 IDs pour les manquants.
+        
+        Returns:
+            Dictionnaire artist_id → {'id', 'name', 'genres', 'popularity'}
+        """
+        return await self._fetch_by_ids(
+            artist_ids, 'spotify_artists', ARTISTS_BATCH,
+            self.sp.artists if self.sp else None,
+            lambda response: [
+                (artist['id'], {
+                    'id': artist['id'],
+                    'name': artist.get('name', ''),
+                    'genres': artist.get('genres', []),
+                    'popularity': artist.get('popularity', 0)
                 })
-        except Exception as e:
-            print(f"⚠️ Features audio non disponibles: {e}")
+                for artist in (response or {}).get('artists', []) if artist
+            ]
+        )
+        
+    async def _fetch_by_ids(self, track_ids: List[str], service: str, batch_size: int,
+                            fetch, extract) -> Dict[str, Dict[str, Any]]:
+        """Lecture groupée par IDs : cache d'abord, puis appels API par lots de `batch_size`"""
+        if not fetch:
+            return {}
+            
+        ids = list(dict.fromkeys(track_id for track_id in track_ids if track_id))
+        cached = self.cache_manager.get_many(ids, service)
+        results = {track_id: entry['response_data'] for track_id, entry in cached.items()}
+        missing = [track_id for track_id in ids if track_id not in results]
+        
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            try:
+                response = await self._run_async(fetch, chunk)
+            except Exception as e:
+                print(f"⚠️ {service} non disponibles ({len(chunk)} tracks): {e}")
+                continue
+                
+            fetched = dict(extract(response))
+            results.update(fetched)
+            self.cache_manager.save_many(fetched, service)
+            
+        if missing:
+            print(f"  📦 {service} : {len(missing)} IDs en {-(-len(missing) // batch_size)} appel(s)")
+        return results
     
     async def analyze_track_contexts(self, track_id: str) -> Dict[str, Any]:
         """Analyse un track dans les playlists pour déterminer ses contextes DJ"""
         if not self.sp or not track_id:
             return {}
             
-        # Vérifier le cache
-        cache_key = f"spotify_contexts_{track_id}"
-        cached_result = self.cache_manager.get_api_cache(cache_key, 'spotify_contexts')
+        # S'assurer que l'index local des playlists est à jour
+        await self.ensure_playlist_index()
         
-        if cached_result:
-            return cached_result['response_data']
-            
-        playlists = self.get_dj_playlists()
-        found_playlists = []
+        # Lecture locale : plus aucun appel API par track
+        found_playlists = self.playlist_index.lookup(track_id)
         contexts = []
         styles = []
         
-        print(f"🔍 Analyse dans {len(playlists)} playlists...")
-        
-        # Analyser par batches pour éviter le rate limiting
-        batch_size = 10
-        playlist_items = list(playlists.items())
-        
-        for i in range(0, len(playlist_items), batch_size):
-            batch = playlist_items[i:i+batch_size]
-            
-            # Analyser en parallèle
-            tasks = []
-            for playlist_id, playlist_name in batch:
-                tasks.append(self._check_track_in_playlist(track_id, playlist_id, playlist_name))
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for result in results:
-                if result and not isinstance(result, Exception):
-                    found_playlists.append(result)
-                    context, style = self._categorize_playlist(result['name'])
-                    if context:
-                        contexts.append(context)
-                    if style:
-                        styles.append(style)
+        for playlist in found_playlists:
+            context, style = self._categorize_playlist(playlist['name'])
+            if context:
+                contexts.append(context)
+            if style:
+                styles.append(style)
         
         # Analyser les résultats
         analysis = {
@@ -347,37 +504,119 @@ class SpotifyAsyncService:
         analysis['contexts'] = self._optimize_contexts(analysis['contexts'], found_playlists)
         analysis['styles'] = self._optimize_styles(analysis['styles'], found_playlists)
         
-        # Sauvegarder dans le cache
-        self.cache_manager.save_api_cache(cache_key, 'spotify_contexts', analysis)
-        
         print(f"✅ Trouvé dans {len(found_playlists)} playlists")
         return analysis
     
-    async def _check_track_in_playlist(self, track_id: str, playlist_id: str, playlist_name: str) -> Optional[Dict[str, Any]]:
-        """Vérifie si un track est dans une playlist spécifique"""
-        try:
-            # Récupérer seulement le premier batch pour vérifier rapidement
-            result = await self._run_async(
-                self.sp.playlist_items,
-                playlist_id,
-                fields='items(track(id))',
-                limit=50
+    async def ensure_playlist_index(self) -> None:
+        """
+        Rafraîchit l'index des playlists s'il est absent ou périmé.
+        
+        Le rafraîchissement tourne dans sa propre tâche (une seule à la fois
+        par boucle d'événements) : un appelant annulé par le délai de son
+        morceau ne l'interrompt pas, les appelants suivants l'attendent, et
+        chaque lot de playlists est sauvegardé dès qu'il est indexé.
+        """
+        playlists = self.get_dj_playlists()
+        if not self.playlist_index.is_stale(list(playlists)):
+            return
+            
+        # L'UI crée une boucle par analyse : une tâche d'une autre boucle est abandonnée
+        loop = asyncio.get_running_loop()
+        task = self._index_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self.refresh_playlist_index())
+            self._index_task = task
+        await asyncio.shield(task)
+    
+    async def refresh_playlist_index(self) -> Dict[str, int]:
+        """
+        Met à jour l'index local des playlists DJ.
+        
+        Seules les playlists dont le `snapshot_id` a changé sont
+        re-téléchargées, avec pagination complète.
+        
+        Returns:
+            Nombre de playlists inchangées, mises à jour et en erreur
+        """
+        stats = {'unchanged': 0, 'updated': 0, 'failed': 0}
+        if not self.sp:
+            return stats
+            
+        playlists = self.get_dj_playlists()
+        print(f"🔄 Mise à jour de l'index de {len(playlists)} playlists...")
+        
+        # Analyser par batches pour éviter le rate limiting
+        batch_size = 10
+        playlist_items = list(playlists.items())
+        
+        # Compteurs propres à l'index : le pipeline partage self.call_stats
+        call_stats = CallStats()
+        for i in range(0, len(playlist_items), batch_size):
+            batch = playlist_items[i:i+batch_size]
+            results = await asyncio.gather(
+                *(self._refresh_playlist(pid, name, call_stats) for pid, name in batch),
+                return_exceptions=True
             )
+            self._print_call_stats(f"playlists {i + 1}-{i + len(batch)}", call_stats)
             
-            if result and result.get('items'):
-                for item in result['items']:
-                    if item and item.get('track') and item['track'].get('id') == track_id:
-                        return {
-                            'id': playlist_id,
-                            'name': playlist_name
-                        }
-                        
-            return None
+            for (playlist_id, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    # Conserver l'ancienne version de la playlist si elle existe
+                    print(f"⚠️ Playlist {playlist_id} non indexée: {result}")
+                    self.playlist_index.mark_failed(playlist_id)
+                    stats['failed'] += 1
+                elif result:
+                    stats['updated'] += 1
+                else:
+                    stats['unchanged'] += 1
+                    
+            # Sauvegarde par lot : une interruption ne perd pas les playlists déjà indexées
+            self.playlist_index.commit()
+        
+        self.playlist_index.retain(list(playlists))
+        self.playlist_index.commit()
+        
+        print(f"✅ Index playlists : {stats['updated']} mises à jour, "
+              f"{stats['unchanged']} inchangées, {stats['failed']} en erreur")
+        return stats
+    
+    async def _refresh_playlist(self, playlist_id: str, playlist_name: str,
+                                call_stats: CallStats) -> bool:
+        """Re-télécharge une playlist si son snapshot a changé. Retourne True si mise à jour."""
+        meta = await self._run_counted(call_stats, self.sp.playlist, playlist_id, fields='snapshot_id')
+        snapshot_id = meta.get('snapshot_id') if meta else None
+        
+        if snapshot_id and snapshot_id == self.playlist_index.get_snapshot(playlist_id):
+            return False
             
-        except Exception:
-            # Ignorer les erreurs silencieusement
-            return None
+        # Pagination complète de la playlist
+        track_ids = []
+        page = await self._run_counted(
+            call_stats,
+            self.sp.playlist_items,
+            playlist_id,
+            fields='items(track(id)),next',
+            limit=100,
+            additional_types=('track',)
+        )
+        
+        while page:
+            for item in page.get('items', []):
+                if item and item.get('track') and item['track'].get('id'):
+                    track_ids.append(item['track']['id'])
+            page = await self._run_counted(call_stats, self.sp.next, page) if page.get('next') else None
+        
+        self.playlist_index.update_playlist(playlist_id, playlist_name, snapshot_id, track_ids)
+        return True
     
+    def _print_call_stats(self, label: str, call_stats: Optional[CallStats] = None) -> Dict[str, int]:
+        """Affiche les compteurs d'appels d'un lot (si des appels ont eu lieu)"""
+        stats = (call_stats or self.call_stats).pop()
+        if any(stats.values()):
+            print(f"  📡 Spotify {label} : {stats['succeeded']} ok, {stats['throttled']} limités (429), "
+                  f"{stats['retried']} relancés, {stats['failed']} en échec")
+        return stats
+        
     def _categorize_playlist(self, playlist_name: str) -> Tuple[Optional[str], Optional[str]]:
         """Catégorise une playlist et retourne (contexte, style)"""
         name_lower = playlist_name.lower()
@@ -446,36 +685,95 @@ class SpotifyAsyncService:
             
         return styles[:4]  # Maximum 4 styles
     
-    async def get_track_artwork(self, track_id: str) -> Optional[bytes]:
-        """Récupère l'artwork d'un track"""
+    async def get_track_artwork(self, track_id: str, album_art: Optional[str] = None) -> Optional[bytes]:
+        """
+        Récupère l'artwork d'un track.
+        
+        Args:
+            album_art: URL déjà connue (résultat de recherche) : aucun appel API
+        """
         if not self.sp or not track_id:
             return None
             
         try:
-            track = await self._run_async(self.sp.track, track_id)
-            
-            if track and track.get('album', {}).get('images'):
-                # Prendre la plus grande image
-                image_url = track['album']['images'][0]['url']
+            if not album_art:
+                # Passe par la lecture groupée (cache par ID, lots de 50)
+                track = (await self.get_tracks_many([track_id])).get(track_id)
+                album_art = track.get('album_art') if track else None
                 
-                # Télécharger l'image
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(image_url) as response:
-                        if response.status == 200:
-                            return await response.read()
+            if album_art:
+                # Prendre la plus grande image
+                return await self.download_image(album_art)
                             
         except Exception as e:
             print(f"❌ Erreur récupération artwork: {e}")
             
         return None
+        
+    async def download_image(self, image_url: str) -> Optional[bytes]:
+        """
+        Télécharge une image (pochette d'album).
+        
+        Une même URL (morceaux d'un même album) n'est téléchargée qu'une fois :
+        les appels simultanés partagent la requête en cours, les suivants
+        lisent le cache (stockage par contenu).
+        """
+        cached = self.cache_manager.get_api_cache(image_url, 'spotify_artwork')
+        if cached:
+            return cached['response_data']
+            
+        return await self.single_flight.do(
+            'spotify_artwork', image_url, lambda: self._download_image(image_url)
+        )
+        
+    async def _download_image(self, image_url: str) -> Optional[bytes]:
+        """Téléchargement effectif via la session partagée"""
+        try:
+            async with self.http.get().get(image_url) as response:
+                if response.status == 200:
+                    image = await response.read()
+                    self.cache_manager.save_many({image_url: image}, 'spotify_artwork')
+                    return image
+        except Exception as e:
+            print(f"❌ Erreur téléchargement artwork: {e}")
+            
+        return None
+        
+    async def close(self) -> None:
+        """Ferme la session HTTP partagée"""
+        await self.http.close()
     
     async def _run_async(self, func, *args, **kwargs):
-        """Exécute une fonction synchrone de manière asynchrone"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, func, *args, **kwargs)
+        """
+        Exécute un appel Spotify synchrone dans le pool de threads.
+        
+        Les échecs temporaires (429, 5xx, réseau) sont relancés par
+        `retry_policy` ; une erreur définitive est levée à l'appelant au lieu
+        d'être confondue avec une réponse vide.
+        """
+        return await self._run_counted(self.call_stats, func, *args, **kwargs)
+        
+    async def _run_counted(self, call_stats: CallStats, func, *args, **kwargs):
+        """_run_async, avec les appels comptés dans `call_stats`"""
+        loop = asyncio.get_running_loop()
+        # run_in_executor n'accepte pas de kwargs : les lier via partial
+        call = functools.partial(func, *args, **kwargs)
+        
+        async def attempt():
+            await self.quota_ledger.acquire('spotify')
+            return await loop.run_in_executor(self.executor, call)
+            
+        return await self.retry_policy.run(attempt, call_stats)
+        
+    def pop_call_stats(self) -> Dict[str, int]:
+        """Compteurs d'appels (réussis, limités, relancés, en échec) depuis le dernier relevé"""
+        return self.call_stats.pop()
     
     def __del__(self):
         """Ferme le pool de threads"""
         if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=False)
\ No newline at end of file
+            self.executor.shutdown(wait=False)
+
+
+# Alias pour la compatibilité (nom exporté par services/__init__.py)
+SpotifyService = SpotifyAsyncService
@@ -14,6 +14,8 @@ from mutagen.mp3 import MP3
 from mutagen.flac import FLAC
 from mutagen.mp4 import MP4
 
+from .artwork_store import ArtworkBlob
+
 
 class TagWriter:
     """
@@ -25,11 +27,38 @@ class TagWriter:
         """Initialise le writer."""
         self.supported_formats = ['.mp3', '.flac', '.aiff', '.wav']
     
+    @staticmethod
+    def build_tags(analysis: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Construit le dictionnaire de tags ID3 à partir d'une analyse.
+        
+        Args:
+            analysis: Résultat d'analyse (AnalysisOrchestrator)
+            
+        Returns:
+            Tags au format ID3, sans les valeurs vides
+        """
+        tags = {
+            'TIT2': analysis.get('title', ''),        # Titre
+            'TPE1': analysis.get('artist', ''),       # Artiste
+            'TALB': analysis.get('album', ''),        # Album
+            'TDRC': str(analysis.get('year', '')),    # Année
+            'TCON': analysis.get('genre', ''),        # Genre
+            'TKEY': analysis.get('key', ''),          # Clé
+            'COMM': analysis.get('comment', ''),      # Commentaire
+            'GRP1': analysis.get('grouping', ''),     # Grouping
+            'TPUB': analysis.get('label', ''),        # Label
+            'TBPM': str(analysis.get('bpm', ''))      # BPM
+        }
+        
+        # Supprimer les tags vides
+        return {k: v for k, v in tags.items() if v and v != 'None'}
+    
     def write_tags(
         self, 
         file_path: str, 
         tags: Dict[str, str], 
-        artwork_bytes: Optional[bytes] = None
+        artwork_bytes: Optional[Union[bytes, ArtworkBlob]] = None
     ) -> bool:
         """
         Écrit les tags dans un fichier audio.
@@ -37,7 +66,7 @@ class TagWriter:
         Args:
             file_path: Chemin vers le fichier
             tags: Dictionnaire des tags à écrire (format ID3)
-            artwork_bytes: Données de l'image de pochette (optionnel)
+            artwork_bytes: Données de l'image de pochette, ou référence du cache (optionnel)
             
         Returns:
             True si succès, False sinon
@@ -103,6 +132,9 @@ class TagWriter:
             
             # Écrire la pochette si fournie
             if artwork_bytes:
+                # Une référence du cache (ArtworkBlob) n'est lue qu'ici
+                artwork_bytes = bytes(artwork_bytes)
+                
                 # Supprimer les anciennes pochettes
                 audio.tags.delall('APIC')
                 
@@ -0,0 +1,93 @@
+"""
+Score de correspondance entre un morceau local et un résultat de recherche
+Titre/artiste normalisés, durée et marqueurs de version (remix, edit...)
+"""
+
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Dict, Optional, Set, Tuple
+
+# Marqueurs distinguant les versions d'un même titre
+VERSION_MARKERS = {
+    'remix', 'edit', 'bootleg', 'live', 'acoustic', 'instrumental', 'extended',
+    'radio', 'remaster', 'remastered', 'rework', 'vip', 'dub', 'mashup', 'cover', 'clean'
+}
+
+# Un résultat au-dessus de ce score arrête les autres recherches
+HIGH_CONFIDENCE = 0.9
+# En dessous, le résultat est rejeté (autre morceau du même artiste...)
+MIN_SCORE = 0.7
+
+# Facteur appliqué quand les versions diffèrent (remix contre original...)
+VERSION_MISMATCH = 0.8
+
+_FEATURING = re.compile(r'\s(feat|ft|featuring)\.?\s.*$')
+_BRACKETS = re.compile(r'[\(\[][^\)\]]*[\)\]]')
+_NON_WORD = re.compile(r'[^\w\s]')
+
+
+def normalize(text: str) -> str:
+    """Minuscules, sans accents ni ponctuation, sans « feat. ... »"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    text = _FEATURING.sub('', text)
+    text = _NON_WORD.sub(' ', text.replace('&', ' and '))
+    return ' '.join(text.split())
+
+
+def split_title(title: str) -> Tuple[str, Set[str]]:
+    """
+    Sépare un titre en (titre de base normalisé, marqueurs de version).
+
+    "Levels (Skrillex Remix)" et "Levels - Radio Edit" donnent le titre de
+    base "levels" et les marqueurs {'remix'} / {'radio', 'edit'}.
+    """
+    title = title or ''
+    base = _BRACKETS.sub(' ', title).split(' - ')[0]
+    markers = set(normalize(title).split()) & VERSION_MARKERS
+    return normalize(base), markers
+
+
+def similarity(a: str, b: str) -> float:
+    """Similarité de deux chaînes normalisées (0 à 1), tolérante à l'ordre des mots"""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    overlap = len(tokens_a & tokens_b) / max(len(tokens_a), len(tokens_b))
+    return max(ratio, overlap)
+
+
+def score_candidate(track: Dict[str, Any], title: str, artist: str,
+                    duration_ms: Optional[int] = None) -> float:
+    """
+    Score (0 à 1) d'un track Spotify pour le morceau recherché.
+
+    Pondération : titre 50 %, artiste 35 %, durée 15 % quand elle est connue
+    des deux côtés ; une version différente (remix, edit...) multiplie le
+    score par VERSION_MISMATCH, ce qui l'empêche d'atteindre HIGH_CONFIDENCE.
+    """
+    wanted_title, wanted_markers = split_title(title)
+    found_title, found_markers = split_title(track.get('name', ''))
+
+    title_score = similarity(wanted_title, found_title)
+    artist_score = max(
+        (similarity(normalize(artist), normalize(found.get('name', '')))
+         for found in track.get('artists', [])),
+        default=0.0
+    )
+    weighted = [(title_score, 0.50), (artist_score, 0.35)]
+    if duration_ms and track.get('duration_ms'):
+        # Identique à 3 s près, nul au-delà de 30 s d'écart
+        gap = abs(duration_ms - track['duration_ms']) / 1000
+        weighted.append((max(0.0, min(1.0, (30 - gap) / 27)), 0.15))
+
+    score = sum(value * weight for value, weight in weighted) / sum(weight for _, weight in weighted)
+
+    # Remix contre original (ou remix différent) : mauvaise version
+    if wanted_markers != found_markers:
+        score *= VERSION_MISMATCH
+    return score
@@ -5,7 +5,7 @@ from pathlib import Path
 from threading import Thread
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 import customtkinter
 from PIL import Image, ImageTk
@@ -14,6 +14,8 @@ import platform
 # Imports relatifs corrigés
 from ..services.analysis_orchestrator import AnalysisOrchestrator
 from ..services.tag_writer import TagWriter
+from ..services.library_scanner import LibraryScanner
+from ..services.quota_ledger import QuotaExhaustedError
 
 
 class FloTagProApp(customtkinter.CTk):
@@ -33,6 +35,7 @@ class FloTagProApp(customtkinter.CTk):
         # --- État de l'application (la mémoire de l'app) ---
         self.all_track_data: Dict[str, Dict[str, Any]] = {}
         self.file_paths: List[str] = []
+        self.file_paths_set: Set[str] = set()  # Déduplication en O(1)
         self.current_track_file_path: Optional[str] = None
         self.artwork_image = None  # Pour garder une référence à l'image
 
@@ -64,6 +67,13 @@ class FloTagProApp(customtkinter.CTk):
         )
         self.add_files_button.pack(side="left", padx=5)
 
+        self.add_folder_button = customtkinter.CTkButton(
+            top_frame, 
+            text="📂 Ajouter Dossier", 
+            command=self.add_folder
+        )
+        self.add_folder_button.pack(side="left", padx=5)
+
         self.analyze_all_button = customtkinter.CTkButton(
             top_frame, 
             text="🔍 Analyser TOUT", 
@@ -345,22 +355,47 @@ class FloTagProApp(customtkinter.CTk):
             filetypes=file_types
         )
         
-        for file_path in new_files:
-            if file_path not in self.file_paths:
-                self.file_paths.append(file_path)
-                filename = os.path.basename(file_path)
-                
-                # Tenter d'extraire artiste et titre du nom de fichier
-                try:
-                    artist, title = filename.rsplit(' - ', 1)
-                    title = title.split('.')[0]  # Enlever l'extension
-                except ValueError:
-                    artist, title = "Inconnu", filename
-                
-                # Ajouter à la liste visuelle avec toutes les colonnes vides pour l'instant
-                self.track_list.insert("", "end", values=(
-                    "⏳", artist, title, "", "", "", "", "", "", ""
-                ))
+        self._add_paths(new_files)
+
+    def add_folder(self):
+        """Importe récursivement tous les fichiers audio d'un dossier (bibliothèque)."""
+        folder = filedialog.askdirectory(title="Sélectionnez un dossier de musique")
+        if not folder:
+            return
+        
+        # Le parcours se fait hors du thread Tk, les lots sont ajoutés au fil de l'eau
+        known = set(self.file_paths_set)
+        Thread(target=self._scan_folder, args=(folder, known), daemon=True).start()
+
+    def _scan_folder(self, folder: str, known: Set[str]):
+        """Parcourt un dossier en parallèle et ajoute les fichiers par lots."""
+        scanner = LibraryScanner()
+        total = 0
+        for batch in scanner.iter_batches([folder], exclude=known):
+            total += len(batch)
+            self.after(0, self._add_paths, batch)
+        print(f"📂 {total} fichiers audio trouvés dans {folder}")
+
+    def _add_paths(self, paths):
+        """Ajoute des fichiers à la liste (en ignorant ceux déjà présents)."""
+        for file_path in paths:
+            if file_path in self.file_paths_set:
+                continue
+            self.file_paths_set.add(file_path)
+            self.file_paths.append(file_path)
+            filename = os.path.basename(file_path)
+            
+            # Tenter d'extraire artiste et titre du nom de fichier
+            try:
+                artist, title = filename.rsplit(' - ', 1)
+                title = title.split('.')[0]  # Enlever l'extension
+            except ValueError:
+                artist, title = "Inconnu", filename
+            
+            # Ajouter à la liste visuelle avec toutes les colonnes vides pour l'instant
+            self.track_list.insert("", "end", values=(
+                "⏳", artist, title, "", "", "", "", "", "", ""
+            ))
 
     def analyze_all_tracks(self):
         """Lance l'analyse de tous les morceaux dans un thread séparé."""
@@ -378,33 +413,39 @@ class FloTagProApp(customtkinter.CTk):
         try:
             loop.run_until_complete(self._analyze_all_async())
         finally:
+            # La session HTTP partagée est liée à cette boucle
+            loop.run_until_complete(self.orchestrator.close())
             loop.close()
 
     async def _analyze_all_async(self):
-        """Analyse tous les morceaux de manière asynchrone."""
+        """Analyse tous les morceaux de manière asynchrone via le pipeline batch."""
         total_files = len(self.file_paths)
         
-        for i, file_path in enumerate(self.file_paths):
-            try:
-                # Mettre à jour le statut
-                self.after(0, self.update_track_status_in_ui, file_path, "🔄", None)
-                
-                # Analyser le fichier
-                analysis_result = await self.orchestrator.analyze_file(file_path)
-                
+        # Tous les morceaux entrent dans le pipeline
+        for file_path in self.file_paths:
+            self.after(0, self.update_track_status_in_ui, file_path, "🔄", None)
+        
+        # Les résultats arrivent dans l'ordre de fin de traitement
+        done = 0
+        async for file_path, analysis_result in self.orchestrator.analyze_many(list(self.file_paths)):
+            done += 1
+            
+            if isinstance(analysis_result, QuotaExhaustedError):
+                # Morceau en file « reprise demain »
+                self.after(0, self.update_track_status_in_ui, file_path, "⏸️", None)
+            elif isinstance(analysis_result, Exception):
+                print(f"Erreur analyse {file_path}: {analysis_result}")
+                self.after(0, self.update_track_status_in_ui, file_path, "❌", None)
+            else:
                 # Stocker le résultat
                 self.all_track_data[file_path] = analysis_result
                 
                 # Mettre à jour l'UI avec toutes les données
                 self.after(0, self.update_track_status_in_ui, file_path, "✅", analysis_result)
-                
-                # Mettre à jour la barre de progression
-                progress = (i + 1) / total_files
-                self.after(0, lambda p=progress: self.progress_bar.set(p))
-                
-            except Exception as e:
-                print(f"Erreur analyse {file_path}: {e}")
-                self.after(0, self.update_track_status_in_ui, file_path, "❌", None)
+            
+            # Mettre à jour la barre de progression
+            progress = done / total_files
+            self.after(0, lambda p=progress: self.progress_bar.set(p))
 
     def format_tags_for_display(self, tags_list, max_length=30):
         """Formate une liste de tags pour l'affichage compact."""
@@ -569,7 +610,8 @@ class FloTagProApp(customtkinter.CTk):
         artwork_bytes = track_data.get('artwork_bytes')
         if artwork_bytes:
             try:
-                image = Image.open(io.BytesIO(artwork_bytes))
+                # Les pochettes du cache sont chargées à la demande
+                image = Image.open(io.BytesIO(bytes(artwork_bytes)))
                 image = image.resize((250, 250), Image.Resampling.LANCZOS)
                 self.artwork_image = ImageTk.PhotoImage(image)
                 self.artwork_label.configure(image=self.artwork_image, text="")
@@ -615,21 +657,7 @@ class FloTagProApp(customtkinter.CTk):
             self.all_track_data[self.current_track_file_path] = track_data
             
             # Créer le dictionnaire des tags pour TagWriter
-            tags_to_write = {
-                'TIT2': track_data.get('title', ''),        # Titre
-                'TPE1': track_data.get('artist', ''),       # Artiste
-                'TALB': track_data.get('album', ''),        # Album
-                'TDRC': str(track_data.get('year', '')),    # Année
-                'TCON': track_data.get('genre', ''),        # Genre
-                'TKEY': track_data.get('key', ''),          # Clé
-                'COMM': track_data.get('comment', ''),      # Commentaire
-                'GRP1': track_data.get('grouping', ''),     # Grouping
-                'TPUB': track_data.get('label', ''),        # Label
-                'TBPM': str(track_data.get('bpm', ''))      # BPM
-            }
-            
-            # Supprimer les tags vides
-            tags_to_write = {k: v for k, v in tags_to_write.items() if v}
+            tags_to_write = self.tag_writer.build_tags(track_data)
             
             # Écrire les tags dans le fichier
             success = self.tag_writer.write_tags(